@@ -0,0 +1,143 @@
+import os
+from collections import namedtuple
+from mplsoccer import Sblocal
+import matplotlib
+matplotlib.use("Agg")
+import sys
+
+# imported after run_benchmarks has pointed the store at the synthetic data
+sys.path.insert(0, "functions/")
+from data_store import open_data_path, load_matches
+from event_schema import normalise_events
+from figure_cache import encode_figure
+from get_fixture_index import get_fixture_index
+from get_match_id import get_match_id
+from get_event_columns import get_event_columns
+from get_formation_segments import get_formation_segments, get_formations
+from get_derived_tables import get_derived_tables, derive_match
+from get_lineup_df import get_lineup_df
+from get_match_stats import match_stats
+from player_list import player_list
+
+sys.path.insert(0, "visualisations/")
+from render_scheduler import RenderRequest, VISUALS, TABLE_VISUALS
+from cumulative_xg import shot_timeline
+from defensive_actions import team_defensive_actions
+from density import event_density
+from gk_passes import get_gk_passes
+from pass_matrix import team_pass_counts
+from pass_network import pass_network_counts
+import pass_maps
+import passes_leading_to_shots
+
+REPO_DIR = os.path.abspath(".")
+
+# stages in the order they run, a case only has some of them
+STAGES = ["fetch", "parse", "transform", "plot", "encode"]
+
+# the fixture a case runs against, player and formation are the first the sidebar would offer
+Match = namedtuple("Match", ["competition_id", "season_id", "home_team", "away_team", "match_id",
+                             "player", "formation"])
+
+# stages maps a stage name to a function of (match, result of the previous stage)
+Case = namedtuple("Case", ["name", "stages"])
+
+def clear_caches():
+    """
+    Empties the in-memory caches of the repository modules, so every repeat measures a cold request.
+    Tables already written to the store are kept, as they would be in production.
+    """
+    for module in list(sys.modules.values()):
+        path = os.path.abspath(getattr(module, "__file__", None) or "")
+        if not path.startswith(REPO_DIR) or os.sep + "benchmarks" + os.sep in path:
+            continue
+        for value in list(vars(module).values()):
+            if not isinstance(value, type) and callable(getattr(value, "cache_clear", None)):
+                value.cache_clear()
+
+def season_match(competition_id, season_id):
+    """
+    Picks the first fixture of a synthetic season and warms the store with it.
+
+    Args:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+
+    Returns:
+        Match: The fixture the cases run against.
+    """
+    fixture = load_matches(competition_id, season_id).iloc[0]
+    home_team, away_team = fixture["home_team_name"], fixture["away_team_name"]
+    match_id = get_match_id(competition_id, season_id, home_team, away_team)
+    get_derived_tables(match_id)
+    get_lineup_df(match_id)
+    player = player_list(competition_id, season_id, home_team, away_team)[1][0]
+    formation = get_formations(competition_id, season_id, home_team, away_team)[0]
+
+    return Match(competition_id, season_id, home_team, away_team, match_id, player, formation)
+
+def _read_raw(match, _):
+    # stands in for the download, the synthetic files are served from the local open-data folder
+    for folder in ["events", "lineups"]:
+        with open(open_data_path(folder, match.match_id), "rb") as f:
+            f.read()
+
+def _parse(match, _):
+    parser = Sblocal()
+    events = parser.event(open_data_path("events", match.match_id))[0]
+    parser.lineup(open_data_path("lineups", match.match_id))
+
+    return normalise_events(events)
+
+def _request(visual, match):
+    params = {"Starting XIs": {"side": "Home"}, "Player Defensive Actions": {"player": match.player},
+              "Pass Network": {"formation": match.formation}}.get(visual, {})
+
+    return RenderRequest(visual, match.competition_id, match.season_id, match.home_team, match.away_team,
+                         tuple(params.items()))
+
+def _visual_case(visual, transform):
+    """
+    A visual timed as its data preparation (transform), drawing with the data cached (plot) and PNG
+    encoding (encode). Tables are rendered to HTML in place of the encoding.
+    """
+    def plot(match, _):
+        return VISUALS[visual](_request(visual, match))
+
+    def encode(match, result):
+        return result.to_html() if visual in TABLE_VISUALS else encode_figure(result)
+
+    return Case(visual, {"transform": transform, "plot": plot, "encode": encode})
+
+def _pass_maps_data(match):
+    get_derived_tables(match.match_id)
+    get_event_columns(match.match_id, pass_maps.EVENT_COLUMNS)
+    get_lineup_df(match.match_id)
+    event_density(match.match_id, match.home_team, "Ball Receipt")
+
+def _passes_leading_to_shots_data(match):
+    get_event_columns(match.match_id, passes_leading_to_shots.EVENT_COLUMNS, passes_leading_to_shots.EVENT_TYPES)
+    get_derived_tables(match.match_id)
+
+CASES = [
+    Case("load_events", {"fetch": _read_raw, "parse": _parse}),
+    Case("get_fixture_index", {"transform": lambda match, _: get_fixture_index(match.competition_id,
+                                                                                match.season_id)}),
+    Case("get_match_id", {"transform": lambda match, _: get_match_id(match.competition_id, match.season_id,
+                                                                      match.home_team, match.away_team)}),
+    Case("get_event_columns", {"transform": lambda match, _: get_event_columns(
+        match.match_id, ["team_name", "type_name", "x", "y"], ["Pass"])}),
+    Case("get_formation_segments", {"transform": lambda match, _: get_formation_segments(match.match_id)}),
+    Case("derive_match", {"transform": lambda match, _: derive_match(match.match_id)}),
+    Case("match_stats", {"transform": lambda match, _: match_stats(match.match_id)}),
+    _visual_case("Starting XIs", lambda match, _: get_derived_tables(match.match_id)),
+    _visual_case("Cumulative xG", lambda match, _: shot_timeline(match.match_id)),
+    _visual_case("Player Defensive Actions", lambda match, _: team_defensive_actions(match.match_id, match.home_team)),
+    _visual_case("Team Defensive Actions", lambda match, _: team_defensive_actions(match.match_id, match.home_team)),
+    _visual_case("GK Passing Distribution", lambda match, _: get_gk_passes(match.match_id, match.home_team)),
+    _visual_case("Player Pass Maps", lambda match, _: _pass_maps_data(match)),
+    _visual_case("Pass Matrix", lambda match, _: team_pass_counts(match.match_id, match.home_team)),
+    _visual_case("Pass Network", lambda match, _: pass_network_counts(match.match_id, match.home_team,
+                                                                       match.formation)),
+    _visual_case("Passes Leading to Shots", lambda match, _: _passes_leading_to_shots_data(match)),
+]
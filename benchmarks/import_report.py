@@ -0,0 +1,136 @@
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# interpreter runs per measurement, the median is kept
+REPEAT = 3
+
+# number of heaviest imports listed
+TOP = 15
+
+# written to stderr between the imports already paid for and the ones being measured
+MARKER = "import report: measured"
+
+def startup_modules(path=os.path.join(REPO_DIR, "main.py")):
+    """
+    Lists the modules main.py imports when the script starts, so the report follows the app.
+
+    Args:
+        path (str): Path of the Streamlit script.
+
+    Returns:
+        list: Module names, in import order.
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+
+    return list(dict.fromkeys(modules))
+
+def import_times(modules, preload=()):
+    """
+    Imports modules in a fresh interpreter with -X importtime and parses its log.
+
+    Args:
+        modules (list): The modules to measure.
+        preload (list): Modules imported first and left out of the log, e.g. the startup modules when
+            measuring a visual.
+
+    Returns:
+        list: One dict per imported module with its name, depth (0 for the modules asked for), self_ms and
+        cumulative_ms, in the order Python logged them.
+    """
+    code = "; ".join(["import sys", "sys.path[:0] = ['functions/', 'visualisations/']"]
+                     + [f"import {module}" for module in preload]
+                     + [f"sys.stderr.write({MARKER!r} + '\\n')"]
+                     + [f"import {module}" for module in modules])
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_DIR,
+                             capture_output=True, text=True, check=True)
+
+    lines = process.stderr.splitlines()
+    rows = []
+    for line in lines[lines.index(MARKER) + 1:]:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                     "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+
+    return rows
+
+def import_report(modules, preload=(), repeat=REPEAT):
+    """
+    Measures the cost of importing modules, as the median of several fresh interpreters.
+
+    Args:
+        modules (list): The modules to measure.
+        preload (list): Modules already imported, their cost is not counted.
+        repeat (int): Number of interpreter runs.
+
+    Returns:
+        dict: total_ms, the time spent importing modules and everything they pulled in, and packages, the
+        milliseconds spent in the modules of each top level package, heaviest first.
+    """
+    totals = []
+    packages = {}
+    for _ in range(repeat):
+        rows = import_times(modules, preload)
+        totals.append(sum(row["cumulative_ms"] for row in rows if row["depth"] == 0))
+        run = {}
+        for row in rows:
+            package = row["module"].split(".")[0]
+            run[package] = run.get(package, 0.0) + row["self_ms"]
+        for package, ms in run.items():
+            packages.setdefault(package, []).append(ms)
+
+    medians = {package: statistics.median(ms) for package, ms in packages.items()}
+
+    return {"total_ms": round(statistics.median(totals), 1),
+            "packages": {package: round(ms, 1) for package, ms in sorted(medians.items(), key=lambda item: -item[1])}}
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Report what the app imports at startup and what each visual "
+                                                     "adds when it is first rendered, like python -X importtime.")
+    arg_parser.add_argument("--repeat", type=int, default=REPEAT)
+    arg_parser.add_argument("--top", type=int, default=TOP, help="number of heaviest packages listed")
+    arg_parser.add_argument("--output", default=None, help="write the report to this JSON file")
+    arg_parser.add_argument("--max-startup-ms", type=float, default=None,
+                            help="fail when the startup imports take longer than this")
+    args = arg_parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    os.chdir(REPO_DIR)
+    sys.path[:0] = ["functions/", "visualisations/"]
+    from render_scheduler import VISUAL_MODULES
+
+    startup = startup_modules()
+    report = {"startup": import_report(startup, repeat=args.repeat), "visuals": {}}
+    print(f"startup {report['startup']['total_ms']:.0f}ms")
+    for package, ms in list(report["startup"]["packages"].items())[:args.top]:
+        print(f"  {package:<28} {ms:>8.1f}ms")
+
+    for visual, module in VISUAL_MODULES.items():
+        report["visuals"][visual] = import_report([module], preload=startup, repeat=args.repeat)
+        heaviest = list(report["visuals"][visual]["packages"].items())[:3]
+        print(f"{visual:<26} +{report['visuals'][visual]['total_ms']:.0f}ms on first use "
+              f"({', '.join(f'{package} {ms:.0f}ms' for package, ms in heaviest)})")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.max_startup_ms is not None and report["startup"]["total_ms"] > args.max_startup_ms:
+        print(f"startup imports take {report['startup']['total_ms']:.0f}ms, over {args.max_startup_ms:.0f}ms")
+        sys.exit(1)
@@ -0,0 +1,105 @@
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+import sys
+
+from synthetic_fixtures import write_season, write_competitions
+
+# concurrent sessions, each renders every visual of its own fixture in turn
+SESSIONS = 4
+
+# events per synthetic match
+SIZE = 3500
+
+VISUALS = ["Cumulative xG", "Team Defensive Actions", "GK Passing Distribution", "Passes Leading to Shots",
+           "Player Pass Maps"]
+
+COMPETITION_ID = 2
+SEASON_ID = 1
+
+def prepare_data(workdir, sessions, size, workers):
+    """
+    Writes a synthetic season with a fixture per session and points the store at it. This has to run before
+    the repository modules are imported, they read their configuration from the environment on import.
+    """
+    open_data_dir = os.path.join(workdir, "open-data")
+    # n teams play n * (n - 1) fixtures
+    num_teams = 2
+    while num_teams * (num_teams - 1) < sessions:
+        num_teams += 1
+    row = write_season(open_data_dir, COMPETITION_ID, SEASON_ID, num_teams=num_teams, num_events=size)
+    write_competitions(open_data_dir, [row])
+
+    os.environ["SB_OPEN_DATA_DIR"] = open_data_dir
+    os.environ["SB_DATA_DIR"] = os.path.join(workdir, "store")
+    os.environ["SB_FIGURE_CACHE_DIR"] = os.path.join(workdir, "figures")
+    os.environ["SB_OFFLINE"] = "1"
+    os.environ["MPLBACKEND"] = "Agg"
+    os.environ["SB_RENDER_WORKERS"] = str(workers)
+
+def run_load(sessions):
+    """
+    Renders every visual for one fixture per session, with the sessions running at the same time like
+    Streamlit script threads, and times how long each session waited for each image.
+
+    Args:
+        sessions (int): Number of concurrent sessions.
+
+    Returns:
+        list: Seconds waited for each render.
+    """
+    from data_store import load_matches
+    from render_scheduler import RenderRequest
+    from render_pool import await_render, shutdown_workers
+
+    fixtures = load_matches(COMPETITION_ID, SEASON_ID)[["home_team_name", "away_team_name"]].values[:sessions]
+    latencies = []
+    lock = threading.Lock()
+
+    def session(home_team, away_team):
+        state = {}
+        for visual in VISUALS:
+            request = RenderRequest(visual, COMPETITION_ID, SEASON_ID, home_team, away_team, ())
+            start = time.perf_counter()
+            await_render(request, state)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session, args=tuple(fixture)) for fixture in fixtures]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        shutdown_workers()
+
+    return latencies
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Time how long concurrent sessions wait for their renders, "
+                                                     "rendered on their own thread or in the render workers.")
+    arg_parser.add_argument("--sessions", type=int, default=SESSIONS)
+    arg_parser.add_argument("--size", type=int, default=SIZE, help="events per match")
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="render processes, 0 renders on the session threads")
+    arg_parser.add_argument("--workdir", default=None, help="folder for the synthetic data, temporary by default")
+    args = arg_parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="sb_render_load_")
+
+    # the repository is imported with paths relative to its root
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    sys.path[:0] = ["functions/", "visualisations/"]
+    prepare_data(workdir, args.sessions, args.size, args.workers)
+
+    start = time.perf_counter()
+    latencies = sorted(run_load(args.sessions))
+    elapsed = time.perf_counter() - start
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    print(f"{args.sessions} sessions, {args.workers} workers: {len(latencies)} renders in {elapsed:.1f}s, "
+          f"p50={statistics.median(latencies) * 1000:.0f}ms p95={p95 * 1000:.0f}ms "
+          f"max={latencies[-1] * 1000:.0f}ms")
@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import sys
+
+from synthetic_fixtures import write_season, write_competitions
+
+# events per synthetic match, a Premier League match has about 3500
+SIZES = [1000, 3500, 7000]
+
+# timings of each stage are repeated and the median is kept
+REPEAT = 3
+
+# a stage regresses when it is this fraction slower than the baseline ...
+THRESHOLD = 0.25
+
+# ... and at least this many seconds slower, so sub-millisecond noise does not fail the gate
+MIN_DELTA = 0.005
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+COMPETITION_ID = 2
+
+def prepare_data(workdir, sizes):
+    """
+    Writes one synthetic season per match size and points the store at it. This has to run before the
+    repository modules are imported, they read their configuration from the environment on import.
+
+    Args:
+        workdir (str): Folder for the synthetic open-data, the store and the figure cache.
+        sizes (list): Events per match, one season is written for each.
+
+    Returns:
+        dict: The season ID of each size.
+    """
+    open_data_dir = os.path.join(workdir, "open-data")
+    seasons = {}
+    rows = []
+    for i, size in enumerate(sizes):
+        seasons[size] = i + 1
+        rows.append(write_season(open_data_dir, COMPETITION_ID, seasons[size], num_teams=2, num_events=size,
+                                 first_match_id=100000 * (i + 1)))
+    write_competitions(open_data_dir, rows)
+
+    os.environ["SB_OPEN_DATA_DIR"] = open_data_dir
+    os.environ["SB_DATA_DIR"] = os.path.join(workdir, "store")
+    os.environ["SB_FIGURE_CACHE_DIR"] = os.path.join(workdir, "figures")
+    os.environ["SB_OFFLINE"] = "1"
+    os.environ["MPLBACKEND"] = "Agg"
+
+    return seasons
+
+def run_benchmarks(seasons, repeat=REPEAT, selected=None):
+    """
+    Times every stage of every case at each match size.
+
+    Args:
+        seasons (dict): The season ID of each size, from prepare_data.
+        repeat (int): Number of timings per stage.
+        selected (list, optional): Only run cases whose name contains one of these strings.
+
+    Returns:
+        dict: Median seconds keyed by "case/size/stage".
+    """
+    from cases import CASES, STAGES, clear_caches, season_match
+
+    cases = [case for case in CASES if not selected or any(name in case.name for name in selected)]
+    results = {}
+    for size, season_id in seasons.items():
+        match = season_match(COMPETITION_ID, season_id)
+        for case in cases:
+            timings = {stage: [] for stage in STAGES if stage in case.stages}
+            for _ in range(repeat):
+                clear_caches()
+                result = None
+                for stage in timings:
+                    start = time.perf_counter()
+                    result = case.stages[stage](match, result)
+                    timings[stage].append(time.perf_counter() - start)
+            for stage, seconds in timings.items():
+                results[f"{case.name}/{size}/{stage}"] = statistics.median(seconds)
+            print(f"{case.name:<26} {size:>6} " +
+                  " ".join(f"{stage}={results[f'{case.name}/{size}/{stage}'] * 1000:.1f}ms" for stage in timings),
+                  flush=True)
+
+    return results
+
+def compare(results, baseline, threshold=THRESHOLD, min_delta=MIN_DELTA):
+    """
+    Finds the stages that got slower than the baseline.
+
+    Args:
+        results (dict): Timings from run_benchmarks.
+        baseline (dict): Timings of the baseline, in the same format.
+        threshold (float): Allowed slow down, as a fraction of the baseline time.
+        min_delta (float): Slow downs under this many seconds are ignored.
+
+    Returns:
+        list: (key, baseline seconds, current seconds) of each regression.
+    """
+    regressions = []
+    for key, seconds in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        if seconds > before * (1 + threshold) and seconds - before > min_delta:
+            regressions.append((key, before, seconds))
+
+    return regressions
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Time the fetch, parse, transform, plot and encode stages of "
+                                                     "the data helpers and visuals on synthetic matches, offline.")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="events per match")
+    arg_parser.add_argument("--repeat", type=int, default=REPEAT)
+    arg_parser.add_argument("--cases", nargs="+", default=None, help="only run cases matching these names")
+    arg_parser.add_argument("--workdir", default=None, help="folder for the synthetic data, temporary by default")
+    arg_parser.add_argument("--output", default=None, help="write the timings to this JSON file")
+    arg_parser.add_argument("--save-baseline", action="store_true",
+                            help=f"write the timings to {BASELINE_PATH}, with --cases only theirs are replaced")
+    arg_parser.add_argument("--compare", nargs="?", const=BASELINE_PATH, default=None,
+                            help="fail when a stage is slower than this baseline JSON")
+    arg_parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    arg_parser.add_argument("--min-delta", type=float, default=MIN_DELTA)
+    args = arg_parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="sb_benchmarks_")
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    # the cases import the repository with paths relative to its root
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    seasons = prepare_data(workdir, args.sizes)
+    results = run_benchmarks(seasons, repeat=args.repeat, selected=args.cases)
+
+    report = {"python": platform.python_version(), "platform": platform.platform(), "repeat": args.repeat,
+              "sizes": args.sizes, "results": results}
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        # a run of a few cases keeps the baseline of the others, e.g. when a case is added
+        if args.cases and os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH) as f:
+                report = {**report, "results": {**json.load(f)["results"], **results}}
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        for key, before, seconds in regressions:
+            print(f"REGRESSION {key}: {before * 1000:.1f}ms -> {seconds * 1000:.1f}ms ({seconds / before - 1:+.0%})")
+        print(f"{len(regressions)} regressions over {args.threshold:.0%} against {baseline_path}")
+        sys.exit(1 if regressions else 0)
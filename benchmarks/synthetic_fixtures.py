@@ -0,0 +1,247 @@
+import json
+import os
+import random
+import uuid
+
+# synthetic open-data, the ids and names follow the StatsBomb open-data specification
+POSITIONS_442 = [(1, "Goalkeeper"), (2, "Right Back"), (3, "Right Center Back"), (5, "Left Center Back"),
+                 (6, "Left Back"), (12, "Right Midfield"), (13, "Right Center Midfield"),
+                 (15, "Left Center Midfield"), (16, "Left Midfield"), (22, "Right Center Forward"),
+                 (24, "Left Center Forward")]
+POSITIONS_433 = [(1, "Goalkeeper"), (2, "Right Back"), (3, "Right Center Back"), (5, "Left Center Back"),
+                 (6, "Left Back"), (10, "Center Defensive Midfield"), (13, "Right Center Midfield"),
+                 (15, "Left Center Midfield"), (17, "Right Wing"), (23, "Center Forward"), (21, "Left Wing")]
+DEFENSIVE_TYPES = [(6, "Block"), (22, "Foul Committed"), (9, "Clearance"), (10, "Interception")]
+HEIGHTS = [(1, "Ground Pass"), (2, "Low Pass"), (3, "High Pass")]
+PLAY_PATTERNS = [(1, "Regular Play"), (1, "Regular Play"), (1, "Regular Play"), (4, "From Throw In"),
+                 (2, "From Corner"), (3, "From Free Kick")]
+
+def _team(team_id, name):
+    players = [{"id": team_id * 100 + i, "name": f"{name} Player {i}", "jersey_number": i}
+               for i in range(1, 19)]
+    return {"id": team_id, "name": name, "players": players}
+
+def _timestamp(minute, second):
+    return f"00:{minute % 60:02d}:{second:02d}.000"
+
+def synthetic_events(match_id, home, away, num_events=3000, seed=0):
+    """
+    Simulates the StatsBomb open-data event file of a match.
+
+    Args:
+        match_id (int): The ID of the match, also seeds the simulation.
+        home (dict): The home team, from _team.
+        away (dict): The away team, from _team.
+        num_events (int): Roughly the number of events to simulate.
+        seed (int): Seed of the simulation.
+
+    Returns:
+        list: The events, as they appear in events/{match_id}.json.
+
+    Notes:
+        The home team starts in a 4-4-2 and switches to a 4-3-3 with a Tactical Shift, the away team plays a
+        4-3-3. Matches have passes with receipts, carries, defensive actions, shots (some assisted), rare own
+        goals and three substitutions per team.
+    """
+    rng = random.Random(seed + match_id)
+    events = []
+
+    def add(period, minute, second, type_id, type_name, team, **extra):
+        event = {"id": str(uuid.UUID(int=rng.getrandbits(128))), "index": len(events) + 1,
+                 "period": period, "timestamp": _timestamp(minute - 45 * (period - 1), second),
+                 "minute": minute, "second": second, "type": {"id": type_id, "name": type_name},
+                 "possession": 1, "possession_team": {"id": team["id"], "name": team["name"]},
+                 "play_pattern": {"id": 1, "name": "Regular Play"},
+                 "team": {"id": team["id"], "name": team["name"]}, "duration": 0.0}
+        event.update(extra)
+        events.append(event)
+        return event
+
+    on_pitch = {}
+    for team, positions, formation in [(home, POSITIONS_442, 442), (away, POSITIONS_433, 433)]:
+        lineup = [{"player": {"id": player["id"], "name": player["name"]},
+                   "position": {"id": position_id, "name": position_name},
+                   "jersey_number": player["jersey_number"]}
+                  for player, (position_id, position_name) in zip(team["players"], positions)]
+        add(1, 0, 0, 35, "Starting XI", team, tactics={"formation": formation, "lineup": lineup})
+        on_pitch[team["id"]] = [(player["player"], player["position"]) for player in lineup]
+
+    per_period = max(num_events // 2, 50)
+    for period in (1, 2):
+        start = 45 * (period - 1)
+        length = 45 + rng.randint(1, 5)
+        add(period, start, 0, 18, "Half Start", home)
+        add(period, start, 0, 18, "Half Start", away)
+        for k in range(per_period):
+            elapsed = k * length * 60 // per_period
+            minute, second = start + elapsed // 60, elapsed % 60
+            team, other = (home, away) if rng.random() < 0.5 else (away, home)
+            players = on_pitch[team["id"]]
+            (player, position), (recipient, _) = rng.sample(players, 2)
+            x, y = rng.uniform(0, 120), rng.uniform(0, 80)
+            end_x, end_y = min(120, max(0, x + rng.gauss(8, 15))), min(80, max(0, y + rng.gauss(0, 15)))
+            pattern_id, pattern = rng.choice(PLAY_PATTERNS)
+            roll = rng.random()
+            if roll < 0.55:
+                height_id, height = rng.choice(HEIGHTS)
+                pass_ = {"recipient": {"id": recipient["id"], "name": recipient["name"]},
+                         "length": 10.0, "angle": 0.1, "height": {"id": height_id, "name": height},
+                         "end_location": [end_x, end_y], "body_part": {"id": 40, "name": "Right Foot"}}
+                complete = rng.random() < 0.8
+                if not complete:
+                    pass_["outcome"] = {"id": 9, "name": "Incomplete"}
+                if pattern == "From Throw In" and rng.random() < 0.3:
+                    pass_["type"] = {"id": 67, "name": "Throw-in"}
+                if position["id"] == 1 and rng.random() < 0.3:
+                    pass_["type"] = {"id": 63, "name": "Goal Kick"}
+                event = add(period, minute, second, 30, "Pass", team, player=player, position=position,
+                            location=[x, y], play_pattern={"id": pattern_id, "name": pattern}, **{"pass": pass_})
+                if complete:
+                    receipt = add(period, minute, second, 42, "Ball Receipt*", team, player=recipient,
+                                  location=[end_x, end_y], play_pattern={"id": pattern_id, "name": pattern},
+                                  related_events=[event["id"]])
+                    event["related_events"] = [receipt["id"]]
+                    if rng.random() < 0.03:
+                        shot_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                        pass_["assisted_shot_id"] = shot_id
+                        pass_["shot_assist"] = True
+                        xg = rng.betavariate(1, 8)
+                        outcome = "Goal" if rng.random() < xg else rng.choice(["Saved", "Off T", "Blocked"])
+                        shot = add(period, minute, second, 16, "Shot", team, player=recipient,
+                                   location=[rng.uniform(95, 118), rng.uniform(20, 60)],
+                                   shot={"statsbomb_xg": xg, "end_location": [120, 40, 1],
+                                         "outcome": {"id": 97, "name": outcome},
+                                         "technique": {"id": 93, "name": "Normal"},
+                                         "type": {"id": 87, "name": "Open Play"},
+                                         "key_pass_id": event["id"]})
+                        shot["id"] = shot_id
+            elif roll < 0.80:
+                add(period, minute, second, 43, "Carry", team, player=player, position=position,
+                    location=[x, y], carry={"end_location": [end_x, end_y]})
+            elif roll < 0.97:
+                type_id, type_name = rng.choice(DEFENSIVE_TYPES)
+                defender, defender_position = rng.choice(on_pitch[other["id"]])
+                extra = {}
+                if type_name == "Interception":
+                    extra["interception"] = {"outcome": {"id": 4, "name": "Won"}}
+                add(period, minute, second, type_id, type_name, other, player=defender,
+                    position=defender_position, location=[x, y], **extra)
+            elif roll < 0.985:
+                xg = rng.betavariate(1, 12)
+                outcome = "Goal" if rng.random() < xg else rng.choice(["Saved", "Off T", "Blocked"])
+                add(period, minute, second, 16, "Shot", team, player=player, position=position,
+                    location=[rng.uniform(90, 118), rng.uniform(15, 65)],
+                    shot={"statsbomb_xg": xg, "end_location": [120, 40, 1],
+                          "outcome": {"id": 97, "name": outcome},
+                          "technique": {"id": rng.choice([93, 95]), "name": rng.choice(["Normal", "Volley"])},
+                          "type": {"id": 87, "name": "Open Play"}})
+            elif roll > 0.9995:
+                add(period, minute, second, 20, "Own Goal Against", other)
+            if period == 2 and k in (per_period // 4, per_period // 2, 3 * per_period // 4):
+                for sub_team in (home, away):
+                    slot = rng.randrange(1, 11)
+                    off_player, off_position = on_pitch[sub_team["id"]][slot]
+                    bench = [p for p in sub_team["players"][11:]
+                             if p["id"] not in [q["id"] for q, _ in on_pitch[sub_team["id"]]]]
+                    if not bench:
+                        continue
+                    replacement = {"id": bench[0]["id"], "name": bench[0]["name"]}
+                    add(period, minute, second, 19, "Substitution", sub_team, player=off_player,
+                        position=off_position,
+                        substitution={"outcome": {"id": 103, "name": "Tactical"}, "replacement": replacement})
+                    on_pitch[sub_team["id"]][slot] = (replacement, off_position)
+            if period == 2 and k == per_period // 3:
+                lineup = [{"player": p, "position": {"id": pos_id, "name": pos_name},
+                           "jersey_number": p["id"] % 100}
+                          for (p, _), (pos_id, pos_name) in zip(on_pitch[home["id"]], POSITIONS_433)]
+                add(period, minute, second, 36, "Tactical Shift", home,
+                    tactics={"formation": 433, "lineup": lineup})
+                on_pitch[home["id"]] = [(p["player"], p["position"]) for p in lineup]
+        add(period, start + length, 0, 34, "Half End", home)
+        add(period, start + length, 0, 34, "Half End", away)
+    return events
+
+def synthetic_lineups(home, away):
+    """
+    Builds the StatsBomb open-data lineup file of a match.
+
+    Args:
+        home (dict): The home team, from _team.
+        away (dict): The away team, from _team.
+
+    Returns:
+        list: The lineups, as they appear in lineups/{match_id}.json.
+    """
+    return [{"team_id": team["id"], "team_name": team["name"],
+             "lineup": [{"player_id": p["id"], "player_name": p["name"], "player_nickname": None,
+                         "jersey_number": p["jersey_number"], "country": {"id": 68, "name": "England"}}
+                        for p in team["players"]]}
+            for team in (home, away)]
+
+def _write_json(data, root, *parts):
+    path = os.path.join(root, *[str(part) for part in parts]) + ".json"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+def write_season(root, competition_id, season_id, num_teams=2, num_events=3000, first_match_id=1000, seed=0):
+    """
+    Writes a synthetic competition season in the open-data folder layout, every team plays every other
+    team home and away.
+
+    Args:
+        root (str): The open-data "data/" folder.
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+        num_teams (int): Number of teams, named "Team A", "Team B", ...
+        num_events (int): Roughly the number of events of each match.
+        first_match_id (int): ID of the first match, the others follow on.
+        seed (int): Seed of the simulation.
+
+    Returns:
+        dict: The season's row of competitions.json, pass the rows of every season to write_competitions.
+    """
+    teams = [_team(i + 1, f"Team {chr(65 + i)}") for i in range(num_teams)]
+    fixtures = [(h, a) for h in teams for a in teams if h is not a]
+    matches = []
+    for i, (home, away) in enumerate(fixtures):
+        match_id = first_match_id + i
+        events = synthetic_events(match_id, home, away, num_events=num_events, seed=seed)
+        goals = {home["id"]: 0, away["id"]: 0}
+        for event in events:
+            if event["type"]["name"] == "Shot" and event["shot"]["outcome"]["name"] == "Goal":
+                goals[event["team"]["id"]] += 1
+            elif event["type"]["name"] == "Own Goal Against":
+                goals[away["id"] if event["team"]["id"] == home["id"] else home["id"]] += 1
+        matches.append({"match_id": match_id, "match_date": f"2015-{8 + i // 30:02d}-{1 + i % 28:02d}",
+                        "kick_off": "15:00:00.000",
+                        "competition": {"competition_id": competition_id, "country_name": "England",
+                                        "competition_name": "Premier League"},
+                        "season": {"season_id": season_id, "season_name": f"Synthetic {season_id}"},
+                        "home_team": {"home_team_id": home["id"], "home_team_name": home["name"],
+                                      "home_team_gender": "male"},
+                        "away_team": {"away_team_id": away["id"], "away_team_name": away["name"],
+                                      "away_team_gender": "male"},
+                        "home_score": goals[home["id"]], "away_score": goals[away["id"]],
+                        "match_status": "available", "last_updated": "2023-01-01T00:00:00",
+                        "match_week": 1 + i})
+        _write_json(events, root, "events", match_id)
+        _write_json(synthetic_lineups(home, away), root, "lineups", match_id)
+    _write_json(matches, root, "matches", competition_id, season_id)
+
+    return {"competition_id": competition_id, "season_id": season_id, "country_name": "England",
+            "competition_name": "Premier League", "competition_gender": "male",
+            "competition_youth": False, "competition_international": False,
+            "season_name": f"Synthetic {season_id}", "match_updated": "2023-01-01T00:00:00",
+            "match_updated_360": None, "match_available_360": None,
+            "match_available": "2023-01-01T00:00:00"}
+
+def write_competitions(root, seasons):
+    """
+    Writes competitions.json listing the synthetic seasons.
+
+    Args:
+        root (str): The open-data "data/" folder.
+        seasons (list): Rows returned by write_season.
+    """
+    _write_json(seasons, root, "competitions")
@@ -0,0 +1,203 @@
+import os
+import threading
+import pandas as pd
+import pyarrow.parquet as pq
+
+from event_schema import normalise_events
+from profiling import span, timed
+
+# directory holding the parsed tables, set SB_DATA_DIR to move it
+STORE_DIR = os.environ.get("SB_DATA_DIR", ".sb_cache/")
+
+# local clone of the statsbomb open-data "data/" folder, used before the network
+OPEN_DATA_DIR = os.environ.get("SB_OPEN_DATA_DIR", os.path.join(STORE_DIR, "open-data"))
+
+# when set, never touch the network and only read from the store / local clone
+OFFLINE = os.environ.get("SB_OFFLINE", "0").lower() in ("1", "true", "yes")
+
+EVENT_TABLES = ["events", "related", "freeze", "tactics"]
+
+def table_path(*parts):
+    """
+    Builds the path of a table inside the store.
+
+    Args:
+        *parts: Sub-folders followed by the table name.
+
+    Returns:
+        str: Path of the Parquet file.
+    """
+    return os.path.join(STORE_DIR, *[str(part) for part in parts]) + ".parquet"
+
+@timed("read")
+def read_table(path, columns=None):
+    """
+    Reads a table from the store.
+
+    Args:
+        path (str): Path of the Parquet file.
+        columns (list, optional): Only read these columns.
+
+    Returns:
+        pandas.DataFrame: The stored table, or None if it has not been stored yet.
+    """
+    if not os.path.exists(path):
+        return None
+
+    return pd.read_parquet(path, columns=columns)
+
+@timed("write")
+def write_table(df, path):
+    """
+    Writes a table to the store. The file is written next to its destination and then moved
+    into place, so concurrent readers never see a partial file. Each thread writes its own temporary
+    file, Streamlit sessions warming the same match share a process.
+
+    Args:
+        df (pandas.DataFrame): The table to store.
+        path (str): Path of the Parquet file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def open_data_path(*parts):
+    """
+    Builds the path of a JSON file inside the local open-data clone.
+
+    Args:
+        *parts: Sub-folders followed by the file name, e.g. ("events", 3754058).
+
+    Returns:
+        str: Path of the JSON file.
+    """
+    return os.path.join(OPEN_DATA_DIR, *[str(part) for part in parts]) + ".json"
+
+def _parse(local_parts, local_parse, online_parse):
+    """
+    Parses a file from the local open-data clone if it exists, otherwise from the network.
+    """
+    # mplsoccer pulls in matplotlib, only pay for it when a file has to be parsed
+    from mplsoccer import Sbopen, Sblocal
+
+    local_path = open_data_path(*local_parts)
+    if os.path.exists(local_path):
+        with span(local_parts[0], "parse"):
+            return local_parse(Sblocal(), local_path)
+    if OFFLINE:
+        raise FileNotFoundError(f"{local_path} is not in the local store and offline mode is on")
+
+    # the download and the parsing happen in the same call, both are counted as fetching
+    with span(local_parts[0], "fetch"):
+        return online_parse(Sbopen())
+
+def load_competitions(refresh=False):
+    """
+    Loads the table of competitions and seasons.
+
+    Args:
+        refresh (bool): Parse the source again even if the table is stored, see get_catalog.
+
+    Returns:
+        pandas.DataFrame: A DataFrame containing competition IDs and related information.
+    """
+    path = table_path("competitions")
+    table = None if refresh else read_table(path)
+    if table is None:
+        table = _parse(["competitions"],
+                       lambda parser, local_path: parser.competition(local_path),
+                       lambda parser: parser.competition())
+        write_table(table, path)
+
+    return table
+
+def load_matches(competition_id, season_id):
+    """
+    Loads the matches of a competition season.
+
+    Args:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+
+    Returns:
+        pandas.DataFrame: A DataFrame containing one row per match.
+    """
+    path = table_path("matches", f"{competition_id}_{season_id}")
+    match = read_table(path)
+    if match is None:
+        match = _parse(["matches", competition_id, season_id],
+                       lambda parser, local_path: parser.match(local_path),
+                       lambda parser: parser.match(competition_id, season_id))
+        write_table(match, path)
+
+    return match
+
+def load_lineup(match_id):
+    """
+    Loads the lineups of a match.
+
+    Args:
+        match_id (int): The ID of the match.
+
+    Returns:
+        pandas.DataFrame: A DataFrame containing one row per player.
+    """
+    path = table_path("lineups", match_id)
+    lineup = read_table(path)
+    if lineup is None:
+        lineup = _parse(["lineups", match_id],
+                        lambda parser, local_path: parser.lineup(local_path),
+                        lambda parser: parser.lineup(match_id))
+        write_table(lineup, path)
+
+    return lineup
+
+def load_events(match_id):
+    """
+    Loads the events of a match.
+
+    Args:
+        match_id (int): The ID of the match.
+
+    Returns:
+        tuple: The events, related, freeze and tactics DataFrames, as returned by Sbopen.event.
+        The events are stored in the compact schema of event_schema.normalise_events.
+    """
+    paths = [table_path("events", match_id, name) for name in EVENT_TABLES]
+    if all(os.path.exists(path) for path in paths):
+        return tuple(read_table(path) for path in paths)
+
+    events, related, freeze, tactics = _parse(["events", match_id],
+                                              lambda parser, local_path: parser.event(local_path),
+                                              lambda parser: parser.event(match_id))
+    tables = (normalise_events(events), related, freeze, tactics)
+    for table, path in zip(tables, paths):
+        write_table(table, path)
+
+    return tables
+
+def load_event_table(match_id, name="events", columns=None):
+    """
+    Loads one of the event tables of a match, reading only the requested columns from the store.
+
+    Args:
+        match_id (int): The ID of the match.
+        name (str): One of EVENT_TABLES.
+        columns (list, optional): Only read these columns. Columns the match does not have
+            (e.g. shot columns in a match without shots) are returned empty.
+
+    Returns:
+        pandas.DataFrame: The table, its rows in the same order as the full table.
+    """
+    path = table_path("events", match_id, name)
+    if not os.path.exists(path):
+        load_events(match_id)
+
+    if columns is None:
+        return read_table(path)
+
+    stored = set(pq.read_schema(path).names)
+    table = read_table(path, columns=[column for column in columns if column in stored])
+
+    return table.reindex(columns=columns)
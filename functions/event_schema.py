@@ -0,0 +1,81 @@
+from pandas.api.types import is_numeric_dtype
+
+# statsbomb position_id -> position abbreviation
+POSITION_ABBREVIATIONS = {1: "GK", 2: "RB", 3: "RCB", 4: "CB", 5: "LCB", 6: "LB", 7: "RWB",
+                          8: "LWB", 9: "RDM", 10: "CDM", 11: "LDM", 12: "RM", 13: "RCM",
+                          14: "CM", 15: "LCM", 16: "LM", 17: "RW", 18: "RAM", 19: "CAM",
+                          20: "LAM", 21: "LW", 22: "RCF", 23: "ST", 24: "LCF", 25: "SS"}
+
+COORDINATE_COLUMNS = ["x", "y", "end_x", "end_y", "end_z", "pass_length", "pass_angle", "duration"]
+
+SMALL_INT_COLUMNS = {"period": "int8", "minute": "int16", "second": "int16",
+                     "index": "int32", "possession": "int32"}
+
+def event_dtypes(events):
+    """
+    Works out the compact dtype of each event column.
+
+    Args:
+        events (pandas.DataFrame): Events as parsed by Sbopen.event.
+
+    Returns:
+        dict: The new dtype of every column that should change, keyed by column name.
+    """
+    dtypes = {}
+    for column, dtype in events.dtypes.items():
+        if column.endswith("_name") or column == "tactics_formation":
+            # enum-like labels (types, teams, outcomes, play patterns, positions, players, ...)
+            dtypes[column] = "category"
+        elif column in COORDINATE_COLUMNS:
+            dtypes[column] = "float32"
+        elif column in SMALL_INT_COLUMNS:
+            dtypes[column] = SMALL_INT_COLUMNS[column]
+        elif (column.endswith("_id") or column == "match_id") and is_numeric_dtype(dtype):
+            # numeric ids are float64 when some events do not have them, keep the missing values as <NA>
+            dtypes[column] = "Int32"
+
+    return {column: dtype for column, dtype in dtypes.items() if str(events[column].dtype) != dtype}
+
+def normalise_events(events):
+    """
+    Converts an event DataFrame to the compact event schema: categorical labels, float32 coordinates,
+    small integer clock columns and nullable int32 ids. Already normalised frames are returned as they are.
+
+    Args:
+        events (pandas.DataFrame): Events as parsed by Sbopen.event.
+
+    Returns:
+        pandas.DataFrame: The events in the compact schema.
+    """
+    dtypes = event_dtypes(events)
+    if not dtypes:
+        return events
+
+    return events.astype(dtypes)
+
+def memory_usage(df):
+    """
+    Measures the deep memory footprint of a DataFrame, including the Python strings it holds.
+
+    Args:
+        df (pandas.DataFrame): The DataFrame to measure.
+
+    Returns:
+        int: The size in bytes.
+    """
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+def schema_memory_report(events):
+    """
+    Measures how much memory the compact schema saves on a match.
+
+    Args:
+        events (pandas.DataFrame): Events as parsed by Sbopen.event.
+
+    Returns:
+        dict: The bytes before and after normalising, and the ratio between them.
+    """
+    before = memory_usage(events)
+    after = memory_usage(normalise_events(events))
+
+    return {"before": before, "after": after, "ratio": before / after if after else float("nan")}
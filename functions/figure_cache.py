@@ -0,0 +1,147 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+import sys
+
+sys.path.insert(0, "functions/")
+from data_store import STORE_DIR
+from profiling import timed
+
+# second tier, encoded figures on disk, set SB_FIGURE_CACHE_DIR to move it
+FIGURE_CACHE_DIR = os.environ.get("SB_FIGURE_CACHE_DIR", os.path.join(STORE_DIR, "figures"))
+
+# first tier, total size of the encoded figures kept in memory per process
+MEMORY_BUDGET_BYTES = int(os.environ.get("SB_FIGURE_CACHE_BYTES", 64 * 1024 * 1024))
+
+# same settings st.pyplot uses, so cached images look the same as a live render
+SAVEFIG_KWARGS = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+
+# bump when images change without a code change here, e.g. after upgrading matplotlib or mplsoccer
+CACHE_VERSION = 1
+
+# folders whose modules draw the figures, every edit to them changes the cache keys
+CODE_DIRS = [os.path.dirname(os.path.abspath(__file__)),
+             os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "visualisations")]
+
+_memory_cache = OrderedDict()
+_memory_bytes = 0
+_lock = threading.Lock()
+
+def code_hash(code_dirs=CODE_DIRS):
+    """
+    Hashes the source of the modules that draw the figures, so images rendered by older code are not served.
+
+    Args:
+        code_dirs (list): Folders whose .py files are hashed.
+
+    Returns:
+        str: A hex digest of the file names and contents.
+    """
+    digest = hashlib.sha1()
+    for code_dir in code_dirs:
+        for name in sorted(os.listdir(code_dir)):
+            if name.endswith(".py"):
+                digest.update(name.encode("utf-8"))
+                with open(os.path.join(code_dir, name), "rb") as f:
+                    digest.update(f.read())
+
+    return digest.hexdigest()
+
+# the visuals, their data transforms and the shared helpers all live in CODE_DIRS, hashed once per process
+CODE_HASH = code_hash()
+
+def figure_cache_key(*parts):
+    """
+    Builds a cache key from everything that determines a figure, including the code that draws it.
+
+    Args:
+        *parts: Hashable values, e.g. the fields of a RenderRequest.
+
+    Returns:
+        str: A hex digest that is stable across processes.
+    """
+    return hashlib.sha1(repr((CACHE_VERSION, CODE_HASH) + parts).encode("utf-8")).hexdigest()
+
+@timed("encode")
+def encode_figure(fig):
+    """
+    Encodes a figure as PNG bytes and closes it, even when the encoding fails.
+
+    Args:
+        fig (matplotlib.figure.Figure): The figure to encode.
+
+    Returns:
+        bytes: The PNG image.
+    """
+    from matplotlib._pylab_helpers import Gcf
+
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, facecolor=fig.get_facecolor(), **SAVEFIG_KWARGS)
+    finally:
+        # drop the artists, and the figure from pyplot in case a caller created it there
+        Gcf.destroy_fig(fig)
+        fig.clear()
+
+    return buffer.getvalue()
+
+def _disk_path(key):
+    return os.path.join(FIGURE_CACHE_DIR, key[:2], f"{key}.png")
+
+def _remember(key, image):
+    global _memory_bytes
+    with _lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return
+        _memory_cache[key] = image
+        _memory_bytes += len(image)
+        # evict least recently used images, always keeping the newest one
+        while _memory_bytes > MEMORY_BUDGET_BYTES and len(_memory_cache) > 1:
+            _, evicted = _memory_cache.popitem(last=False)
+            _memory_bytes -= len(evicted)
+
+@timed("cache")
+def get_cached_figure(key):
+    """
+    Looks up an encoded figure in memory, then on disk.
+
+    Args:
+        key (str): The key from figure_cache_key.
+
+    Returns:
+        bytes: The PNG image, or None if it has not been cached.
+    """
+    with _lock:
+        image = _memory_cache.get(key)
+        if image is not None:
+            _memory_cache.move_to_end(key)
+            return image
+
+    path = _disk_path(key)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        image = f.read()
+    _remember(key, image)
+
+    return image
+
+def put_cached_figure(key, image):
+    """
+    Stores an encoded figure in memory and on disk.
+
+    Args:
+        key (str): The key from figure_cache_key.
+        image (bytes): The PNG image.
+    """
+    _remember(key, image)
+
+    path = _disk_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(image)
+    os.replace(tmp_path, path)
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+import sys
+
+sys.path.insert(0, "functions/")
+from data_store import STORE_DIR, OFFLINE, load_competitions, open_data_path, read_table, table_path
+from profiling import timed
+
+# the network source has no mtime to compare, so its snapshot is fetched again after this many seconds,
+# set SB_CATALOG_TTL to change it
+CATALOG_TTL = int(os.environ.get("SB_CATALOG_TTL", 24 * 60 * 60))
+
+# what the competitions snapshot in the store was built from: the mtime, size and hash of the local
+# competitions.json, or when it was fetched from the network
+SOURCE_PATH = os.path.join(STORE_DIR, "competitions_source.json")
+
+Catalog = namedtuple("Catalog", ["competitions", "competition_names", "seasons"])
+
+_state = {"catalog": None, "source": None, "loaded_at": 0.0}
+_lock = threading.Lock()
+
+def _local_source():
+    path = open_data_path("competitions")
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+
+    return {"mtime": stat.st_mtime, "size": stat.st_size}
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+def _read_source():
+    if not os.path.exists(SOURCE_PATH):
+        return None
+    with open(SOURCE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_source(source):
+    os.makedirs(os.path.dirname(SOURCE_PATH) or ".", exist_ok=True)
+    tmp_path = f"{SOURCE_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(source, f)
+    os.replace(tmp_path, SOURCE_PATH)
+
+def load_catalog_table():
+    """
+    Loads the competitions table from its snapshot in the store, parsing the source again only when it changed.
+
+    A local competitions.json is compared by mtime and size, then by hash, so touching the file does not
+    trigger a parse. Without a local file the snapshot is refreshed from the network after CATALOG_TTL seconds.
+
+    Returns:
+        pandas.DataFrame: One row per competition season.
+    """
+    stored = _read_source()
+    snapshot_exists = os.path.exists(table_path("competitions"))
+    local = _local_source()
+    if local is not None:
+        if snapshot_exists and stored is not None and all(stored.get(key) == value for key, value in local.items()):
+            return read_table(table_path("competitions"))
+        sha1 = _file_hash(open_data_path("competitions"))
+        unchanged = snapshot_exists and stored is not None and stored.get("sha1") == sha1
+        table = read_table(table_path("competitions")) if unchanged else load_competitions(refresh=True)
+        _write_source({**local, "sha1": sha1})
+        return table
+
+    if OFFLINE or (snapshot_exists and stored is not None and time.time() - stored.get("fetched", 0) < CATALOG_TTL):
+        return load_competitions()
+    table = load_competitions(refresh=True)
+    _write_source({"fetched": time.time()})
+
+    return table
+
+@timed("transform")
+def build_catalog(table):
+    """
+    Indexes the competitions table for the lookups of the sidebar.
+
+    Args:
+        table (pandas.DataFrame): The competitions table, see load_catalog_table.
+
+    Returns:
+        Catalog: A named tuple containing:
+            - competitions (pandas.DataFrame): The table, sorted by competition name and newest season first.
+            - competition_names (dict): Competition name keyed by competition ID, sorted by name.
+            - seasons (dict): For each competition ID, the season names keyed by season ID, newest first.
+    """
+    competitions = (table.sort_values(["competition_name", "competition_id", "season_name"],
+                                      ascending=[True, True, False])
+                    .reset_index(drop=True))
+
+    competition_names = {}
+    seasons = {}
+    for competition_id, competition_name, season_id, season_name in zip(
+            competitions["competition_id"], competitions["competition_name"],
+            competitions["season_id"], competitions["season_name"]):
+        competition_names[int(competition_id)] = competition_name
+        seasons.setdefault(int(competition_id), {})[int(season_id)] = season_name
+
+    return Catalog(competitions, competition_names, seasons)
+
+def get_catalog():
+    """
+    Returns the catalog of competitions and seasons, kept in memory and only rebuilt when its source changes.
+
+    Returns:
+        Catalog: See build_catalog. It is shared between callers and must not be modified.
+
+    Notes:
+        Each call only stats the local competitions.json, so it is cheap enough to run on every Streamlit rerun.
+    """
+    with _lock:
+        source = _local_source()
+        catalog = _state["catalog"]
+        if catalog is not None and source == _state["source"] and (
+                source is not None or time.monotonic() - _state["loaded_at"] < CATALOG_TTL):
+            return catalog
+
+        catalog = build_catalog(load_catalog_table())
+        _state.update(catalog=catalog, source=source, loaded_at=time.monotonic())
+
+    return catalog
@@ -0,0 +1,142 @@
+import numpy as np
+from collections import namedtuple
+import os
+import sys
+
+sys.path.insert(0, "functions/")
+from data_store import table_path, read_table, write_table, load_event_table
+from event_schema import normalise_events
+from profiling import timed
+from sized_cache import sized_cache
+
+# bump when a derived table changes, older stored tables are then rebuilt
+DERIVED_VERSION = 1
+
+# number of matches whose derived tables are kept in memory per process
+MAX_CACHED_MATCHES = 32
+
+DERIVED_TABLES = ["passes", "shots", "defensive_actions", "substitutions", "starting_xi", "periods"]
+
+DerivedTables = namedtuple("DerivedTables", DERIVED_TABLES)
+
+DEFENSIVE_ACTION_TYPES = ["Block", "Foul Committed", "Clearance", "Interception"]
+
+PASS_COLUMNS = ["team_name", "period", "play_pattern_name", "player_id", "player_name", "position_name",
+                "pass_recipient_id", "pass_recipient_name", "pass_height_name", "outcome_name",
+                "x", "y", "end_x", "end_y"]
+SHOT_COLUMNS = ["id", "match_id", "type_name", "period", "timestamp", "minute", "second", "team_name",
+                "player_name", "outcome_name", "technique_name", "shot_statsbomb_xg", "x", "y"]
+DEFENSIVE_ACTION_COLUMNS = ["type_name", "period", "team_name", "player_name", "x", "y"]
+SUBSTITUTION_COLUMNS = ["team_name", "minute", "player_id", "player_name",
+                        "substitution_replacement_id", "substitution_replacement_name"]
+
+# every event is read once, the match clock needs the length of each period
+EVENT_COLUMNS = list(dict.fromkeys(["id", "type_name", "sub_type_name", "tactics_formation"] + PASS_COLUMNS +
+                                   SHOT_COLUMNS + DEFENSIVE_ACTION_COLUMNS + SUBSTITUTION_COLUMNS))
+
+def match_clock(events):
+    """
+    Convert the period, minute and second of each event into a continuous match clock in minutes.
+
+    Args:
+        events (pandas.DataFrame): Events of a single match.
+
+    Returns:
+        pandas.Series: Minutes since kick off, aligned with events.
+
+    Notes:
+        StatsBomb restarts the minute at 45 for the second half, so first half stoppage time overlaps the
+        start of the second half. Each period is shifted to start where the previous one ended, which keeps
+        stoppage time in both halves and makes the clock increase with (period, minute, second).
+    """
+    clock = events["minute"] + events["second"] / 60
+    period_start = clock.groupby(events["period"]).min()
+    period_end = clock.groupby(events["period"]).max()
+    overlap = (period_end.shift(1) - period_start).clip(lower=0).fillna(0)
+
+    return clock + events["period"].map(overlap.cumsum())
+
+@timed("transform")
+def build_derived_tables(events, tactics):
+    """
+    Build the intermediate tables the visuals share from the events of a match, in one grouped pass.
+
+    Args:
+        events (pandas.DataFrame): The events of the match, with at least EVENT_COLUMNS.
+        tactics (pandas.DataFrame): The tactics table of the match.
+
+    Returns:
+        DerivedTables: A named tuple containing:
+            - passes (pandas.DataFrame): Every pass except throw-ins.
+            - shots (pandas.DataFrame): Shots and own goals, with their time on the match clock.
+            - defensive_actions (pandas.DataFrame): Blocks, fouls committed, clearances and interceptions.
+            - substitutions (pandas.DataFrame): One row per substitution, with the minute, the player
+              coming off (player_id/player_name) and the player coming on (substitution_replacement_*).
+            - starting_xi (pandas.DataFrame): The starting players of both teams with their team_name,
+              tactics_formation, player_id, player_name, position_id and jersey_number.
+            - periods (pandas.DataFrame): The start and end of each period on the match clock.
+    """
+    # row positions of every event type, the only pass over the events
+    rows = events.groupby("type_name", observed=True).indices
+    no_rows = np.array([], dtype=np.int64)
+
+    def of_type(*type_names, columns):
+        positions = np.sort(np.concatenate([rows.get(type_name, no_rows) for type_name in type_names]))
+        return events[columns].iloc[positions].reset_index(drop=True)
+
+    clock = match_clock(events)
+
+    passes = of_type("Pass", columns=PASS_COLUMNS + ["sub_type_name"])
+    passes = passes[passes["sub_type_name"] != "Throw-in"].drop(columns="sub_type_name").reset_index(drop=True)
+
+    shot_rows = np.sort(np.concatenate([rows.get("Shot", no_rows), rows.get("Own Goal Against", no_rows)]))
+    shots = events[SHOT_COLUMNS].iloc[shot_rows].assign(clock=clock.iloc[shot_rows]).reset_index(drop=True)
+
+    defensive_actions = of_type(*DEFENSIVE_ACTION_TYPES, columns=DEFENSIVE_ACTION_COLUMNS)
+    substitutions = of_type("Substitution", columns=SUBSTITUTION_COLUMNS)
+
+    starting_xi = (of_type("Starting XI", columns=["id", "team_name", "tactics_formation"])
+                   .merge(tactics, on="id")
+                   [["team_name", "tactics_formation", "player_id", "player_name", "position_id", "jersey_number"]])
+
+    periods = (clock.groupby(events["period"]).agg(["min", "max"])
+               .rename(columns={"min": "start", "max": "end"}).rename_axis("period").reset_index())
+
+    return DerivedTables(passes, shots, defensive_actions, substitutions, starting_xi, periods)
+
+def derive_match(match_id):
+    """
+    Build the derived tables of a match and store them next to its events.
+
+    Args:
+        match_id (int): The ID of the match.
+
+    Returns:
+        DerivedTables: The derived tables, see build_derived_tables.
+    """
+    events = normalise_events(load_event_table(match_id, "events", EVENT_COLUMNS))
+    tactics = load_event_table(match_id, "tactics")
+    tables = build_derived_tables(events, tactics)
+    for name, table in zip(DERIVED_TABLES, tables):
+        write_table(table, table_path("events", match_id, f"derived_v{DERIVED_VERSION}", name))
+
+    return tables
+
+@sized_cache(max_entries=MAX_CACHED_MATCHES)
+@timed("transform")
+def get_derived_tables(away_team_id):
+    """
+    Loads the derived tables of a match from the store, building them on first use, and keeps them in a sized cache.
+
+    Args:
+        away_team_id (int): The ID of the match.
+
+    Returns:
+        DerivedTables: The derived tables, see build_derived_tables. They are shared between callers and must
+        not be modified.
+    """
+    paths = [table_path("events", away_team_id, f"derived_v{DERIVED_VERSION}", name) for name in DERIVED_TABLES]
+    if not all(os.path.exists(path) for path in paths):
+        return derive_match(away_team_id)
+
+    return DerivedTables(*[read_table(path) for path in paths])
@@ -0,0 +1,57 @@
+import sys
+
+sys.path.insert(0, "functions/")
+from data_store import load_event_table
+from event_schema import normalise_events
+from profiling import timed
+from sized_cache import sized_cache
+
+# number of column projections kept in memory per process, each visual uses one or two per match
+MAX_CACHED_VIEWS = 128
+
+@sized_cache(max_entries=MAX_CACHED_VIEWS)
+@timed("transform")
+def get_event_table(away_team_id, name="events", columns=None):
+    """
+    Loads one event table of a match, reading only the given columns, and keeps it in a sized cache.
+
+    Args:
+        away_team_id (int): The ID of the match.
+        name (str): "events", "related", "freeze" or "tactics".
+        columns (tuple, optional): Only read these columns, the whole table is read when not given.
+
+    Returns:
+        pandas.DataFrame: The table. It is shared between callers and must not be modified.
+    """
+    table = load_event_table(away_team_id, name, None if columns is None else list(columns))
+
+    return normalise_events(table) if name == "events" else table
+
+@sized_cache(max_entries=MAX_CACHED_VIEWS)
+@timed("transform")
+def _event_view(away_team_id, columns, event_types):
+    read_columns = columns if event_types is None or "type_name" in columns else columns + ("type_name",)
+    events = get_event_table(away_team_id, "events", read_columns)
+    if event_types is None:
+        return events
+
+    return events.loc[events["type_name"].isin(event_types), list(columns)]
+
+def get_event_columns(away_team_id, columns, event_types=None):
+    """
+    Get the events of a match restricted to the columns and event types a visual declares.
+
+    Args:
+        away_team_id (int): The ID of the match.
+        columns (list): The event columns to read.
+        event_types (list, optional): Only keep events of these types, all events are kept when not given.
+
+    Returns:
+        pandas.DataFrame: The projected events. The index matches the full event table so projections of
+        the same match can be joined. It is shared between callers and must not be modified.
+
+    Notes:
+        The column projection is pushed down into the Parquet read, so columns a visual does not use are
+        never parsed.
+    """
+    return _event_view(away_team_id, tuple(columns), None if event_types is None else tuple(event_types))
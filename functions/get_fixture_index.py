@@ -0,0 +1,68 @@
+from collections import namedtuple
+import sys
+
+sys.path.insert(0, "functions/")
+from data_store import load_matches
+from profiling import timed
+from sized_cache import sized_cache
+
+# number of competition seasons kept in memory per process
+MAX_CACHED_SEASONS = 16
+
+Fixture = namedtuple("Fixture", ["match_id", "home_score", "away_score", "match_date"])
+
+FixtureIndex = namedtuple("FixtureIndex", ["fixtures", "home_teams", "away_teams", "opponents"])
+
+@sized_cache(max_entries=MAX_CACHED_SEASONS)
+@timed("transform")
+def get_fixture_index(competition_id, season_id):
+    """
+    Builds a lookup of every fixture in a competition season from a single read of the match table.
+
+    Args:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+
+    Returns:
+        FixtureIndex: A named tuple containing:
+            - fixtures (dict): The Fixtures (match_id, home_score, away_score, match_date) of each
+              (home_team, away_team) pair, oldest first. Most pairs meet once, but e.g. a group and a knockout
+              match between the same teams are both kept.
+            - home_teams (list): Unique home team names, in match table order.
+            - away_teams (list): Unique away team names, grouped by home team.
+            - opponents (dict): The unique away teams each home team played, keyed by home team.
+    """
+    match = load_matches(competition_id, season_id)
+
+    fixtures = {}
+    opponents = {}
+    for home, away, match_id, home_score, away_score, match_date in zip(
+            match["home_team_name"], match["away_team_name"], match["match_id"],
+            match["home_score"], match["away_score"], match["match_date"]):
+        fixtures.setdefault((home, away), []).append(Fixture(int(match_id), home_score, away_score, match_date))
+        opponents.setdefault(home, {})[away] = None
+
+    for pair_fixtures in fixtures.values():
+        pair_fixtures.sort(key=lambda fixture: fixture.match_date)
+    opponents = {home: list(aways) for home, aways in opponents.items()}
+    home_teams = list(opponents.keys())
+    away_teams = list(dict.fromkeys(away for home in home_teams for away in opponents[home]))
+
+    return FixtureIndex(fixtures, home_teams, away_teams, opponents)
+
+def team_match_ids(competition_id, season_id, team):
+    """
+    Get the matches a team played in a competition season, home and away.
+
+    Args:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+        team (str): The name of the team.
+
+    Returns:
+        list: The match IDs, in match table order.
+    """
+    fixtures = get_fixture_index(competition_id, season_id).fixtures
+
+    return [fixture.match_id for (home, away), pair_fixtures in fixtures.items() if team in (home, away)
+            for fixture in pair_fixtures]
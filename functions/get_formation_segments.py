@@ -0,0 +1,94 @@
+import pandas as pd
+from collections import namedtuple
+import sys
+
+sys.path.insert(0, "functions/")
+from get_match_id import get_match_id
+from get_event_columns import get_event_columns, get_event_table
+from event_schema import POSITION_ABBREVIATIONS
+from profiling import timed
+from sized_cache import sized_cache
+
+# columns read to segment a match, over every event type
+EVENT_COLUMNS = ["id", "type_name", "team_name", "tactics_formation", "player_id", "pass_recipient_id",
+                 "substitution_replacement_id", "substitution_replacement_name"]
+
+FormationSegments = namedtuple("FormationSegments", ["events", "positions", "formations"])
+
+@sized_cache(max_entries=32)
+@timed("transform")
+def get_formation_segments(away_team_id):
+    """
+    Splits a match into formation segments, one per Starting XI / Tactical Shift event of each team.
+
+    Args:
+        away_team_id (int): The ID of the match.
+
+    Returns:
+        FormationSegments: A named tuple containing:
+            - events (pandas.DataFrame): Aligned with the match events, the tactics_id (segment id) and
+              tactics_formation in place for the event's team, and the position_abbreviation of the player
+              and of the pass recipient within that segment.
+            - positions (pandas.DataFrame): The player to position map of every segment, with the tactics_id,
+              player_id, player_name, jersey_number and position_abbreviation columns. Substitutes take the
+              position of the player they replaced.
+            - formations (dict): The formations each team used, in order of use, keyed by team name.
+    """
+    events = get_event_columns(away_team_id, EVENT_COLUMNS)
+    tactics = get_event_table(away_team_id, "tactics")
+
+    # the tactics event starting each segment, carried forward over the team's following events
+    is_tactics = events["tactics_formation"].notnull()
+    segments = pd.DataFrame({"team_name": events["team_name"],
+                             "tactics_id": events["id"].where(is_tactics),
+                             "tactics_formation": events["tactics_formation"].where(is_tactics)})
+    segments[["tactics_id", "tactics_formation"]] = segments.groupby("team_name")[[
+        "tactics_id", "tactics_formation"]].ffill()
+
+    # normalise the formation labels (e.g. 4231.0 or "4231" -> "4231") once per formation, not per event
+    labels = {formation: str(int(formation)) for formation in segments["tactics_formation"].dropna().unique()}
+    segments["tactics_formation"] = segments["tactics_formation"].map(labels)
+
+    positions = tactics.rename({"id": "tactics_id"}, axis="columns")
+    positions["position_abbreviation"] = positions["position_id"].map(POSITION_ABBREVIATIONS)
+
+    # substitutes play in the position of the player they replaced
+    sub = events.loc[events["type_name"] == "Substitution", ["player_id", "substitution_replacement_id",
+                                                             "substitution_replacement_name"]]
+    sub["tactics_id"] = segments.loc[sub.index, "tactics_id"]
+    players_sub = positions.merge(sub, on=["tactics_id", "player_id"], how="inner", validate="1:1")
+    players_sub = (players_sub[["tactics_id", "substitution_replacement_id", "substitution_replacement_name",
+                                "position_id", "position_abbreviation"]]
+                   .rename({"substitution_replacement_id": "player_id",
+                            "substitution_replacement_name": "player_name"}, axis="columns"))
+
+    positions = pd.concat([positions, players_sub], ignore_index=True)
+    positions = positions[["tactics_id", "player_id", "player_name", "jersey_number", "position_id",
+                           "position_abbreviation"]].drop_duplicates(["tactics_id", "player_id"], keep="first")
+
+    # look up the position of the player and the pass recipient in the event's segment
+    position_lookup = positions.set_index(["tactics_id", "player_id"])["position_abbreviation"]
+    for column, suffix in [("player_id", ""), ("pass_recipient_id", "_receipt")]:
+        keys = pd.MultiIndex.from_arrays([segments["tactics_id"], events[column]])
+        segments[f"position_abbreviation{suffix}"] = position_lookup.reindex(keys).to_numpy()
+
+    formations = {team: list(team_formations.dropna().unique())
+                  for team, team_formations in segments.groupby("team_name")["tactics_formation"]}
+
+    return FormationSegments(segments.drop(columns="team_name"), positions, formations)
+
+def get_formations(competition_id, season_id, home_team, away_team):
+    """
+    Retrieve the unique formations used by the specified home team.
+
+    Args:
+        away_team_id (int): The ID of the away team.
+        home_team (str): The name of the home team.
+
+    Returns:
+        list: A list of unique formations used by the specified home team.
+    """
+    away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
+    home_formation = list(get_formation_segments(away_team_id).formations[home_team])
+
+    return home_formation
@@ -1,8 +1,10 @@
-from mplsoccer import Sbopen
 import pandas as pd
+import sys
+
+sys.path.insert(0, "functions/")
+from data_store import load_lineup
 
 def get_lineup_df(away_team_id):
-    parser = Sbopen()
-    lineup = parser.lineup(away_team_id)
+    lineup = load_lineup(away_team_id)
 
     return lineup
@@ -0,0 +1,108 @@
+import pandas as pd
+from collections import namedtuple
+import sys
+
+sys.path.insert(0, "functions/")
+from get_event_columns import get_event_columns
+from get_derived_tables import DEFENSIVE_ACTION_TYPES
+from map_matches import map_matches
+from profiling import timed
+from sized_cache import sized_cache
+
+# columns read for the stats, over every event type
+EVENT_COLUMNS = ["type_name", "period", "team_name", "player_name", "outcome_name", "shot_statsbomb_xg",
+                 "pass_assisted_shot_id"]
+
+# shot outcomes that would have gone in without the goalkeeper
+ON_TARGET_OUTCOMES = ["Goal", "Saved", "Saved To Post"]
+
+# counted columns, pass_completion is added from passes and passes_completed
+STATS = ["matches", "shots", "shots_on_target", "goals", "own_goals", "xg", "passes", "passes_completed",
+         "key_passes", "defensive_actions"]
+
+MatchStats = namedtuple("MatchStats", ["players", "teams"])
+
+def event_stats(events):
+    """
+    Turns events into one row of stat increments per event, without a Python loop over the rows.
+
+    Args:
+        events (pandas.DataFrame): Events with at least EVENT_COLUMNS.
+
+    Returns:
+        pandas.DataFrame: The team_name and player_name of each event, followed by one column per stat of STATS
+        (except matches) holding what the event adds to it.
+    """
+    type_name = events["type_name"]
+    outcome = events["outcome_name"]
+    # penalty shootout kicks (period 5) are not shots of the match and do not change the score
+    is_shot = (type_name == "Shot") & (events["period"] < 5)
+    is_pass = type_name == "Pass"
+
+    return pd.DataFrame({
+        "team_name": events["team_name"],
+        "player_name": events["player_name"],
+        "shots": is_shot,
+        "shots_on_target": is_shot & outcome.isin(ON_TARGET_OUTCOMES),
+        "goals": is_shot & (outcome == "Goal"),
+        "own_goals": type_name == "Own Goal Against",
+        "xg": events["shot_statsbomb_xg"].where(is_shot, 0.0).fillna(0.0).astype("float64"),
+        "passes": is_pass,
+        # a completed pass has no outcome
+        "passes_completed": is_pass & outcome.isna(),
+        # pass_shot_assist is only set when the shot missed, a pass assisting a goal has pass_goal_assist instead
+        "key_passes": is_pass & events["pass_assisted_shot_id"].notnull(),
+        "defensive_actions": type_name.isin(DEFENSIVE_ACTION_TYPES),
+    })
+
+def _with_completion(stats):
+    stats = stats.astype({stat: "int64" for stat in STATS if stat != "xg"})
+    stats["pass_completion"] = (stats["passes_completed"] / stats["passes"].where(stats["passes"] > 0)).fillna(0.0)
+
+    return stats
+
+@sized_cache(max_entries=64)
+@timed("transform")
+def match_stats(away_team_id):
+    """
+    Computes the player and team summary of a match with one grouped aggregation over its events.
+
+    Args:
+        away_team_id (int): The ID of the match.
+
+    Returns:
+        MatchStats: A named tuple containing:
+            - players (pandas.DataFrame): One row per player who had an event, indexed by team_name and
+              player_name, with the columns of STATS and pass_completion (a fraction).
+            - teams (pandas.DataFrame): The same stats added up per team, indexed by team_name.
+        Both are shared between callers and must not be modified.
+    """
+    stats = event_stats(get_event_columns(away_team_id, EVENT_COLUMNS))
+    # events without a player (e.g. own goals) are grouped under an empty name so they still count for the team
+    stats["player_name"] = stats["player_name"].astype(object).fillna("")
+    grouped = stats.groupby(["team_name", "player_name"], observed=True, sort=False).sum()
+    grouped.insert(0, "matches", 1)
+    teams = grouped.groupby(level="team_name", observed=True, sort=False).sum()
+    teams["matches"] = 1
+    players = grouped[grouped.index.get_level_values("player_name") != ""]
+
+    return MatchStats(_with_completion(players), _with_completion(teams))
+
+def matches_stats(match_ids, max_workers=None):
+    """
+    Computes the player and team summary over many matches, e.g. a team's season.
+
+    Args:
+        match_ids (list): The matches to add up.
+        max_workers (int, optional): Number of processes, see map_matches.
+
+    Returns:
+        MatchStats: See match_stats, with matches counting the matches each player or team had an event in.
+    """
+    per_match = map_matches(match_stats, match_ids, max_workers=max_workers)
+    players = (pd.concat([stats.players[STATS] for stats in per_match])
+               .groupby(level=["team_name", "player_name"], observed=True, sort=False).sum())
+    teams = (pd.concat([stats.teams[STATS] for stats in per_match])
+             .groupby(level="team_name", observed=True, sort=False).sum())
+
+    return MatchStats(_with_completion(players), _with_completion(teams))
@@ -0,0 +1,36 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# number of processes used for season aggregates, set SB_SEASON_WORKERS to change it
+SEASON_WORKERS = int(os.environ.get("SB_SEASON_WORKERS", os.cpu_count() or 1))
+
+def map_matches(function, match_ids, *args, max_workers=None, **kwargs):
+    """
+    Runs a per-match function over many matches in a process pool.
+
+    Args:
+        function (callable): Module level function taking the match ID first, e.g. get_gk_passes.
+        match_ids (list): The matches to run the function on.
+        *args: Passed on to the function after the match ID.
+        max_workers (int, optional): Number of processes, defaults to SEASON_WORKERS. With one worker or one
+            match the function runs in this process.
+        **kwargs: Passed on to the function.
+
+    Returns:
+        list: The result for each match, in the order of match_ids.
+
+    Notes:
+        Each worker keeps its own match caches, so the results should be small (counts, sums or filtered rows)
+        and combined by the caller in a reduce step.
+    """
+    max_workers = min(max_workers or SEASON_WORKERS, len(match_ids))
+    task = partial(_call, function, args, kwargs)
+    if max_workers <= 1:
+        return [task(match_id) for match_id in match_ids]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(task, match_ids))
+
+def _call(function, args, kwargs, match_id):
+    return function(match_id, *args, **kwargs)
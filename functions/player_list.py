@@ -0,0 +1,32 @@
+import sys
+
+sys.path.insert(0, "functions/")
+from get_match_id import get_match_id
+from get_derived_tables import get_derived_tables
+from profiling import timed
+
+@timed("transform")
+def player_list(competition_id, season_id, home_team, away_team):
+    """
+    Get a DataFrame containing filtered event data for the home team and a list of unique player names.
+
+    Parameters:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+        home_team (str): The name of the home team.
+        away_team (str): The name of the away team.
+
+    Returns:
+        tuple: A tuple containing:
+            - DataFrame: Filtered event data for the home team.
+            - list: A list of unique player names.
+    """
+    away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
+    df = get_derived_tables(away_team_id).defensive_actions
+
+    HOME = home_team
+
+    filt = df[df["team_name"] == HOME]
+
+    players = list(filt["player_name"].unique())
+    return filt, players
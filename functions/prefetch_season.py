@@ -0,0 +1,130 @@
+import argparse
+import os
+import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import sys
+
+sys.path.insert(0, "functions/")
+from data_store import open_data_path, load_matches, load_lineup, load_events
+from get_derived_tables import derive_match
+
+OPEN_DATA_URL = "https://raw.githubusercontent.com/statsbomb/open-data/master/data/"
+
+# number of matches fetched at the same time
+MAX_WORKERS = 8
+
+def create_session(pool_size=MAX_WORKERS):
+    """
+    Creates an HTTP session whose connection pool is shared by all prefetch workers.
+
+    Args:
+        pool_size (int): Number of pooled connections, should match the number of workers.
+
+    Returns:
+        requests.Session: A session that keeps connections alive and retries transient errors.
+    """
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+def download_json(session, base_url, *parts):
+    """
+    Downloads an open-data JSON file into the local clone, skipping files that are already there.
+
+    Args:
+        session (requests.Session): The pooled HTTP session.
+        base_url (str): URL of the open-data "data/" folder.
+        *parts: Sub-folders followed by the file name, e.g. ("events", 3754058).
+
+    Returns:
+        str: Path of the local JSON file.
+    """
+    path = open_data_path(*parts)
+    if os.path.exists(path):
+        return path
+
+    url = base_url.rstrip("/") + "/" + "/".join(str(part) for part in parts) + ".json"
+    response = session.get(url, timeout=30)
+    response.raise_for_status()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(response.content)
+    os.replace(tmp_path, path)
+
+    return path
+
+def prefetch_match(session, match_id, base_url=OPEN_DATA_URL):
+    """
+    Downloads the events and lineups of a match and stores their parsed and derived tables.
+
+    Args:
+        session (requests.Session): The pooled HTTP session.
+        match_id (int): The ID of the match.
+        base_url (str): URL of the open-data "data/" folder.
+
+    Returns:
+        int: The ID of the match.
+    """
+    download_json(session, base_url, "events", match_id)
+    download_json(session, base_url, "lineups", match_id)
+    load_events(match_id)
+    derive_match(match_id)
+    load_lineup(match_id)
+
+    return match_id
+
+def prefetch_season(competition_id, season_id, max_workers=MAX_WORKERS, base_url=OPEN_DATA_URL):
+    """
+    Warms the local store with every match of a competition season.
+
+    Args:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+        max_workers (int): Number of matches fetched at the same time.
+        base_url (str): URL of the open-data "data/" folder, can point to a local file server.
+
+    Returns:
+        tuple: A tuple containing:
+            - list: IDs of the matches that were stored.
+            - dict: Errors of the matches that failed, keyed by match ID.
+    """
+    session = create_session(max_workers)
+    download_json(session, base_url, "matches", competition_id, season_id)
+    match_ids = [int(x) for x in load_matches(competition_id, season_id)["match_id"]]
+
+    done, failed = [], {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(prefetch_match, session, match_id, base_url): match_id
+                   for match_id in match_ids}
+        for future in as_completed(futures):
+            try:
+                done.append(future.result())
+            except Exception as e:
+                failed[futures[future]] = e
+    session.close()
+
+    return done, failed
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Prefetch every match of a competition season into the local store.")
+    arg_parser.add_argument("competition_id", type=int)
+    arg_parser.add_argument("season_id", type=int)
+    arg_parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    arg_parser.add_argument("--base-url", default=OPEN_DATA_URL)
+    args = arg_parser.parse_args()
+
+    done, failed = prefetch_season(args.competition_id, args.season_id,
+                                   max_workers=args.workers, base_url=args.base_url)
+    print(f"stored {len(done)} matches, {len(failed)} failed")
+    for match_id, error in failed.items():
+        print(f"  {match_id}: {error}")
+    sys.exit(1 if failed else 0)
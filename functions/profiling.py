@@ -0,0 +1,202 @@
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# timing spans are only recorded when SB_PROFILE is set, otherwise span / timed / trace do nothing
+PROFILE = os.environ.get("SB_PROFILE", "0").lower() in ("1", "true", "yes")
+
+# also run cProfile over every traced request, much slower than the spans
+CPROFILE = PROFILE and os.environ.get("SB_CPROFILE", "0").lower() in ("1", "true", "yes")
+
+# finished traces are appended to this JSON lines file, set SB_PROFILE_LOG to move it
+PROFILE_LOG = os.environ.get("SB_PROFILE_LOG", os.path.join(os.environ.get("SB_DATA_DIR", ".sb_cache/"),
+                                                             "profile.jsonl"))
+
+# number of functions kept from the cProfile statistics, by cumulative time
+PROFILE_TOP = 30
+
+# "wait" is the time spent waiting for another process, less the spans that process sent back
+STAGES = ["import", "fetch", "parse", "read", "write", "transform", "cache", "plot", "encode", "wait"]
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_log_lock = threading.Lock()
+
+@contextmanager
+def _span(name, stage):
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    stack = trace["_stack"]
+    record = {"name": name, "stage": stage, "depth": len(stack),
+              "start_ms": round((time.perf_counter() - trace["_start"]) * 1000, 3)}
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        child_ms = stack.pop()
+        if stack:
+            stack[-1] += ms
+        record["ms"] = round(ms, 3)
+        record["self_ms"] = round(ms - child_ms, 3)
+        trace["spans"].append(record)
+
+def span(name, stage):
+    """
+    Times a block of code as one stage of the current request.
+
+    Args:
+        name (str): What is being timed, e.g. the function name.
+        stage (str): One of STAGES.
+
+    Returns:
+        A context manager. It does nothing when profiling is off or outside of a trace.
+    """
+    if not PROFILE:
+        return nullcontext()
+
+    return _span(name, stage)
+
+def timed(stage, name=None):
+    """
+    Decorator timing every call of a function as a span. Put it under sized_cache so only cache misses are timed.
+
+    Args:
+        stage (str): One of STAGES.
+        name (str, optional): Name of the span, defaults to the function name.
+
+    Returns:
+        callable: The decorator. When profiling is off the function is returned unchanged.
+    """
+    def decorate(function):
+        if not PROFILE:
+            return function
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with _span(name or function.__name__, stage):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+@contextmanager
+def collect_spans():
+    """
+    Collects the spans of a block run for a trace of another process, e.g. a render in a worker, without
+    logging them. Hand the result to merge_spans in the process holding the trace.
+
+    Yields:
+        dict or None: The collected spans and the wall clock time they are counted from, filled in once the
+        block has ended. None when profiling is off.
+    """
+    if not PROFILE:
+        yield None
+        return
+
+    record = {"time": time.time(), "spans": [], "_stack": [], "_start": time.perf_counter()}
+    token = _current_trace.set(record)
+    try:
+        yield record
+    finally:
+        _current_trace.reset(token)
+        del record["_stack"], record["_start"]
+
+def merge_spans(collected):
+    """
+    Adds the spans from collect_spans to the current trace, nested under the span that is open, whose own
+    time no longer counts them.
+
+    Args:
+        collected (dict or None): The result of collect_spans.
+    """
+    trace = _current_trace.get()
+    if trace is None or collected is None:
+        return
+
+    stack = trace["_stack"]
+    # perf_counter does not compare across processes, the wall clock does
+    offset_ms = (collected["time"] - trace["time"]) * 1000
+    for record in collected["spans"]:
+        trace["spans"].append({**record, "depth": record["depth"] + len(stack),
+                               "start_ms": round(record["start_ms"] + offset_ms, 3)})
+        if record["depth"] == 0 and stack:
+            stack[-1] += record["ms"]
+
+def stage_breakdown(spans):
+    """
+    Adds up the time spent in each stage, counting nested spans only once.
+
+    Args:
+        spans (list): The spans of a trace.
+
+    Returns:
+        dict: Milliseconds spent in each stage, in the order of STAGES.
+    """
+    totals = {}
+    for record in spans:
+        totals[record["stage"]] = totals.get(record["stage"], 0.0) + record["self_ms"]
+
+    ordered = [stage for stage in STAGES if stage in totals] + [stage for stage in totals if stage not in STAGES]
+
+    return {stage: round(totals[stage], 3) for stage in ordered}
+
+def _profile_text(profiler):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP)
+
+    return stream.getvalue()
+
+def _append_log(record):
+    line = json.dumps({key: value for key, value in record.items() if key != "profile"}, default=str)
+    os.makedirs(os.path.dirname(PROFILE_LOG) or ".", exist_ok=True)
+    with _log_lock, open(PROFILE_LOG, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+@contextmanager
+def trace(label, **fields):
+    """
+    Collects the spans of one request. When the block ends the trace gets its total time and stage breakdown,
+    and it is appended to PROFILE_LOG.
+
+    Args:
+        label (str): What the request is, e.g. the visual name.
+        **fields: Extra JSON serialisable values stored with the trace, e.g. the fixture.
+
+    Yields:
+        dict or None: The trace, with label, time, ms, stages, spans and (with SB_CPROFILE) profile once the
+        block has ended. None when profiling is off.
+    """
+    if not PROFILE:
+        yield None
+        return
+
+    record = {"label": label, **fields, "time": time.time(), "spans": [], "_stack": [],
+              "_start": time.perf_counter()}
+    token = _current_trace.set(record)
+    profiler = cProfile.Profile() if CPROFILE else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            record["profile"] = _profile_text(profiler)
+        _current_trace.reset(token)
+        record["ms"] = round((time.perf_counter() - record.pop("_start")) * 1000, 3)
+        del record["_stack"]
+        record["spans"].sort(key=lambda span_record: span_record["start_ms"])
+        record["stages"] = stage_breakdown(record["spans"])
+        _append_log(record)
@@ -0,0 +1,188 @@
+import hashlib
+import inspect
+import itertools
+import os
+import sys
+import threading
+from collections import OrderedDict
+from functools import wraps
+import numpy as np
+import pandas as pd
+
+# total size of the values kept by every sized cache of a process, set SB_CACHE_BYTES to change it
+CACHE_BUDGET_BYTES = int(os.environ.get("SB_CACHE_BYTES", 512 * 1024 * 1024))
+
+# which entry is evicted when the budget is exceeded, "lru" (least recently used) or "lfu" (least frequently used)
+CACHE_POLICY = os.environ.get("SB_CACHE_POLICY", "lru").lower()
+
+# cache name -> store, kept at module level so the caches of main.py survive Streamlit reruns
+_caches = {}
+_clock = itertools.count()
+_lock = threading.RLock()
+
+def deep_size(value, _seen=None):
+    """
+    Measures the memory held by a value, following containers and the data of DataFrames and arrays.
+
+    Args:
+        value: The value to measure, e.g. a DataFrame or a named tuple of DataFrames.
+
+    Returns:
+        int: The size in bytes. Objects reached twice are only counted once.
+    """
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(deep_size(key, _seen) + deep_size(item, _seen)
+                                          for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(deep_size(item, _seen) for item in value)
+    if hasattr(value, "data") and isinstance(value.data, pd.DataFrame):
+        # a Styler, sized by the table it styles
+        return deep_size(value.data, _seen)
+
+    return sys.getsizeof(value)
+
+def _freeze(value):
+    """
+    Turns lists, sets and dicts in the arguments into tuples so they can be part of a cache key.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(item) for item in value))
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+
+    return value
+
+def _total_bytes():
+    return sum(store["bytes"] for store in _caches.values())
+
+def _evict(keep):
+    """
+    Evicts entries, from any cache, until the values fit in the budget. The entry just added is kept.
+    """
+    while _total_bytes() > CACHE_BUDGET_BYTES:
+        candidates = [(entry[2] if CACHE_POLICY == "lfu" else 0, entry[3], name, key)
+                      for name, store in _caches.items()
+                      for key, entry in store["entries"].items() if (name, key) != keep]
+        if not candidates:
+            return
+        _, _, name, key = min(candidates)
+        _remove(_caches[name], key)
+
+def _remove(store, key):
+    _, size, _, _ = store["entries"].pop(key)
+    store["bytes"] -= size
+    store["evictions"] += 1
+
+def sized_cache(max_entries=None, name=None):
+    """
+    Decorator caching the results of a function in memory, within a byte budget shared by every sized cache
+    of the process. Each value is measured with deep_size when it is stored, and the least recently (or, with
+    SB_CACHE_POLICY=lfu, least frequently) used entries are evicted once CACHE_BUDGET_BYTES is exceeded.
+
+    Args:
+        max_entries (int, optional): Also keep at most this many entries in this cache.
+        name (str, optional): Name of the cache in cache_report, defaults to the module and function name.
+
+    Returns:
+        callable: The decorator. The decorated function has cache_clear() and cache_info() like lru_cache.
+
+    Notes:
+        Cached values are shared between callers and must not be modified. Functions decorated again with the
+        same name and code, as happens on every Streamlit rerun, share the entries of the first one.
+    """
+    def decorate(function):
+        code = inspect.unwrap(function).__code__.co_code
+        cache_name = name or f"{function.__module__}.{function.__qualname__}"
+        with _lock:
+            store = _caches.get(cache_name)
+            if store is None or store["code"] != hashlib.sha1(code).hexdigest():
+                store = {"code": hashlib.sha1(code).hexdigest(), "entries": OrderedDict(), "bytes": 0,
+                         "hits": 0, "misses": 0, "evictions": 0}
+                _caches[cache_name] = store
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            key = (_freeze(args), _freeze(kwargs))
+            with _lock:
+                entry = store["entries"].get(key)
+                if entry is not None:
+                    entry[2] += 1
+                    entry[3] = next(_clock)
+                    store["entries"].move_to_end(key)
+                    store["hits"] += 1
+                    return entry[0]
+                store["misses"] += 1
+
+            value = function(*args, **kwargs)
+            size = deep_size(value)
+            with _lock:
+                if key in store["entries"]:
+                    _, old_size, _, _ = store["entries"].pop(key)
+                    store["bytes"] -= old_size
+                store["entries"][key] = [value, size, 1, next(_clock)]
+                store["bytes"] += size
+                while max_entries is not None and len(store["entries"]) > max_entries:
+                    _remove(store, next(iter(store["entries"])))
+                _evict(keep=(cache_name, key))
+
+            return value
+
+        def cache_clear():
+            with _lock:
+                store["entries"].clear()
+                store["bytes"] = 0
+
+        def cache_info():
+            with _lock:
+                return {"entries": len(store["entries"]), "bytes": store["bytes"], "hits": store["hits"],
+                        "misses": store["misses"], "evictions": store["evictions"]}
+
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_info = cache_info
+
+        return wrapper
+
+    return decorate
+
+def cache_report():
+    """
+    Reports the memory footprint of every sized cache of the process.
+
+    Returns:
+        pandas.DataFrame: One row per cache with its entries, bytes, hits, misses and evictions, largest first.
+        The budget and policy are in the attrs of the DataFrame.
+    """
+    with _lock:
+        rows = [{"cache": cache_name, "entries": len(store["entries"]), "bytes": store["bytes"],
+                 "hits": store["hits"], "misses": store["misses"], "evictions": store["evictions"]}
+                for cache_name, store in _caches.items()]
+
+    report = pd.DataFrame(rows, columns=["cache", "entries", "bytes", "hits", "misses", "evictions"])
+    report = report.sort_values("bytes", ascending=False).reset_index(drop=True)
+    report.attrs = {"budget_bytes": CACHE_BUDGET_BYTES, "policy": CACHE_POLICY}
+
+    return report
+
+def clear_caches():
+    """
+    Empties every sized cache of the process.
+    """
+    with _lock:
+        for store in _caches.values():
+            store["entries"].clear()
+            store["bytes"] = 0
@@ -1,21 +1,26 @@
 import streamlit as st
-import mplsoccer
 import pandas as pd
-import matplotlib.pyplot as plt
 
 import sys
 import os
+from contextlib import nullcontext
 sys.path.insert(0, "css/")
 sys.path.insert(1, "visualisations/")
-
-from defensive_actions import * 
-from get_formations import *
-from gk_passes import *
-from pass_maps import *
-from pass_matrix import *
-from pass_network import *
-from passes_leading_to_shots import *
-from cumulative_xg import *
+sys.path.insert(2, "functions/")
+
+# the visual modules are imported by render_scheduler when a visual is first rendered, keep them out of here
+from get_catalog import get_catalog
+from get_fixture_index import get_fixture_index
+from get_match_id import get_match_id
+from get_formation_segments import get_formation_segments, get_formations
+from player_list import player_list
+from get_event_columns import get_event_columns
+from get_derived_tables import get_derived_tables
+from get_match_stats import match_stats
+from render_scheduler import RenderRequest
+from render_pool import await_render
+from profiling import PROFILE, trace
+from sized_cache import sized_cache, cache_report
 
 # Page Configuration
 #region  ----------------------------------------- #
@@ -44,26 +49,7 @@ with title_column:
 
 # Functions
 #region  ----------------------------------------- #
-@st.cache_data
-def get_competition_ids():
-    """
-    Fetches a table of competition IDs for a specific season.
-
-    This function uses the Sbopen parser to retrieve a table of competition data
-    for a specific season (season_id = 27). It then filters out the "Champions League"
-    competition from the table.
-
-    Returns:
-        pandas.DataFrame: A DataFrame containing competition IDs and related information.
-    """
-    parser = Sbopen()
-    table = parser.competition()
-    table = table[table["season_id"] == 27].reset_index(drop=True)
-    table = table.loc[table["competition_name"] != "Champions League"]
-    
-    return table
-
-@st.cache_data
+@sized_cache()
 def get_home_teams(season_id, competition_id):
     """
     Retrieves a list of home teams for a specific season and competition.
@@ -75,66 +61,26 @@ def get_home_teams(season_id, competition_id):
     Returns:
         list: A list of unique home team names.
     """
-    parser = Sbopen()
-    match = parser.match(competition_id, season_id)
-
-    home_teams = list(match["home_team_name"].unique())
+    home_teams = list(get_fixture_index(competition_id, season_id).home_teams)
 
     return home_teams
 
-@st.cache_data
-def get_away_teams(home_teams, season_id, competition_id):
-    """
-    Retrieves a list of away teams for a specific set of home teams, season, and competition.
-
-    Args:
-        home_teams (list): A list of home team names.
-        season_id (int): The ID of the season.
-        competition_id (int): The ID of the competition.
-
-    Returns:
-        list: A list of unique away team names.
-    """
-    parser = Sbopen()
-    match = parser.match(competition_id, season_id)
-    
-    teams = {elem : pd.DataFrame() for elem in home_teams}
-    for key in teams.keys():
-        teams[key] = match[:][match["home_team_name"] == key] 
-
-    # Combine matches for all home teams
-    selected_home_team_matches = pd.concat(teams.values())
-
-    unique_away_teams = selected_home_team_matches["away_team_name"].unique()
-    return list(unique_away_teams)
-
-@st.cache_data
+@sized_cache()
 def get_scoreline(competition_id, season_id, home_team, away_team):
-                parser = Sbopen()
-                match = parser.match(competition_id, season_id)
+                # the same match get_match_id picks when the teams met more than once
+                fixture = get_fixture_index(competition_id, season_id).fixtures[(home_team, away_team)][-1]
 
-                unq = match["home_team_name"].unique()
-                teams = {elem : pd.DataFrame() for elem in unq}
-
-                for key in teams.keys():
-                    teams[key] = match[:][match["home_team_name"] == key] 
-
-                df = teams[home_team]
-
-                # home score
-                home_score = df[df["away_team_name"] == away_team]["home_score"].iloc[0]
-
-                # away score
-                away_score = df[df["away_team_name"] == away_team]["away_score"].iloc[0]
+                home_score = fixture.home_score
+                away_score = fixture.away_score
 
                 text = f"{home_team} {home_score}:{away_score} {away_team}"
                 return text
 
-@st.cache_data
+@sized_cache()
 def get_goals_data(competition_id, season_id, home_team, away_team):
     away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
-    goals = get_event_df(away_team_id)
-    goals_df = goals[goals["type_name"].isin(["Shot", "Own Goal Against"]) & 
+    goals = get_derived_tables(away_team_id).shots
+    goals_df = goals[
     (goals["outcome_name"].isin(["Goal"]) | pd.isna(goals["outcome_name"]))].reset_index(drop=True)
     goals_df = goals_df[["period", "timestamp", "team_name", "player_name", 
                         "technique_name", "shot_statsbomb_xg"]] \
@@ -146,11 +92,43 @@ def get_goals_data(competition_id, season_id, home_team, away_team):
                             "technique_name":"Shot Technique",
                             "shot_statsbomb_xg":"xG"})
     
-    # Add "Own Goal" column
-    goals_df['Own Goal'] = goals_df.apply(lambda row: True if pd.isna(row['xG']) and pd.isna(row['Shot Technique']) else False, axis=1)
+    # Add "Own Goal" column, own goals have neither an xG nor a technique
+    goals_df['Own Goal'] = goals_df['xG'].isna() & goals_df['Shot Technique'].isna()
     return goals_df
 
-@st.cache_data
+@sized_cache()
+def get_stats_tables(competition_id, season_id, home_team, away_team):
+    """
+    Builds the team and player stats tables of a match, as shown below every visual.
+
+    Args:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+        home_team (str): The name of the home team.
+        away_team (str): The name of the away team.
+
+    Returns:
+        tuple: The team table and the player table (pandas.DataFrame), players sorted by team and xG.
+    """
+    away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
+    stats = match_stats(away_team_id)
+
+    labels = {"team_name": "Team", "player_name": "Player", "shots": "Shots", "shots_on_target": "On Target",
+              "goals": "Goals", "own_goals": "Own Goals", "xg": "xG", "passes": "Passes",
+              "passes_completed": "Completed", "pass_completion": "Pass %", "key_passes": "Key Passes",
+              "defensive_actions": "Defensive Actions"}
+
+    def display(table):
+        table = table.drop(columns="matches").assign(xg=table["xg"].round(2),
+                                                     pass_completion=(table["pass_completion"] * 100).round(1))
+        return table.reset_index().rename(columns=labels)
+
+    players = stats.players.sort_values("xg", ascending=False, kind="stable")
+    players = players.sort_index(level="team_name", kind="stable", sort_remaining=False)
+
+    return display(stats.teams), display(players)
+
+@sized_cache()
 def pass_network_df(competition_id, season_id, home_team, away_team, formation):
     """
     Generate a pass network DataFrame for a given match.
@@ -165,32 +143,19 @@ def pass_network_df(competition_id, season_id, home_team, away_team, formation):
         pandas.DataFrame: Pass network DataFrame.
     """
     away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
-    events = get_event_df(away_team_id)
-    tactics = get_tactics_df(away_team_id)
+    segments = get_formation_segments(away_team_id)
 
     HOME = home_team
     FORMATION = formation
 
-    events.loc[events["tactics_formation"].notnull(), "tactics_id"] = events.loc[
-        events["tactics_formation"].notnull(), "id"]
-
-    events[["tactics_id", "tactics_formation"]] = events.groupby("team_name")[[
-        "tactics_id", "tactics_formation"]].ffill()
-
-    events = events.loc[(events["team_name"] == HOME) & (events.tactics_formation == FORMATION)]
-
-    ids = list(events["player_id"].unique())
-    ids = [int(x) for x in ids if not np.isnan(x)]
+    # the home team's segments played in this formation
+    home_events = get_event_columns(away_team_id, ["team_name"])["team_name"] == HOME
+    tactics_ids = segments.events.loc[home_events & (segments.events["tactics_formation"] == FORMATION),
+                                      "tactics_id"].unique()
 
-    formation_dict = {1: "GK", 2: "RB", 3: "RCB", 4: "CB", 5: "LCB", 6: "LB", 7: "RWB",
-                    8: "LWB", 9: "RDM", 10: "CDM", 11: "LDM", 12: "RM", 13: "RCM",
-                    14: "CM", 15: "LCM", 16: "LM", 17: "RW", 18: "RAM", 19: "CAM",
-                    20: "LAM", 21: "LW", 22: "RCF", 23: "ST", 24: "LCF", 25: "SS"}
-    tactics["position_abbreviation"] = tactics["position_id"].map(formation_dict)
-    
-    tact_ids = list(tactics["player_id"].unique())
-    tact_ids = [x for x in tact_ids if x in ids]
-    tactics = tactics.loc[tactics["player_id"].isin(tact_ids)][["position_abbreviation", "player_name", "jersey_number"]]
+    tactics = segments.positions
+    tactics = tactics.loc[tactics["tactics_id"].isin(tactics_ids) & tactics["jersey_number"].notnull()]
+    tactics = tactics[["position_abbreviation", "player_name", "jersey_number"]].astype({"jersey_number": "int"})
     tactics_df = tactics.drop_duplicates(subset=["jersey_number"], keep="first")
     tactics_df = tactics_df.set_index("jersey_number")
 
@@ -199,66 +164,62 @@ def pass_network_df(competition_id, season_id, home_team, away_team, formation):
 
 # Sidebar Content
 #region  ----------------------------------------- #
-season_id = 27
-comp_table_ids = get_competition_ids()
+# season selected when the page opens, when the first league has it
+DEFAULT_SEASON_ID = 27
+catalog = get_catalog()
 
 st.sidebar.image("https://raw.githubusercontent.com/statsbomb/logos/main/StatsBombPython_Lock.svg", use_column_width=True)
-st.sidebar.success("Select a League & Home Team of interest and see how they performed against the selected Away Team")
+st.sidebar.success("Select a League, Season & Home Team of interest and see how they performed against the selected Away Team")
 
-league_options = list(comp_table_ids["competition_name"].unique())
-league_selector = st.sidebar.radio(label="League:", options=league_options)
+league_options = list(catalog.competition_names)
+default_league = next((index for index, competition_id in enumerate(league_options)
+                       if DEFAULT_SEASON_ID in catalog.seasons[competition_id]), 0)
+selected_competition_id = st.sidebar.selectbox(label="League:", options=league_options, index=default_league,
+                                               format_func=catalog.competition_names.get)
 
-selected_competition_row = comp_table_ids[comp_table_ids["competition_name"] == league_selector]
-selected_competition_id = selected_competition_row["competition_id"].iloc[0]
+season_options = list(catalog.seasons[selected_competition_id])
+default_season = season_options.index(DEFAULT_SEASON_ID) if DEFAULT_SEASON_ID in season_options else 0
+season_id = st.sidebar.selectbox(label="Season:", options=season_options, index=default_season,
+                                 format_func=catalog.seasons[selected_competition_id].get)
 
 home_teams = get_home_teams(season_id, selected_competition_id)
 home_options = home_teams
 
-away_teams = get_away_teams(home_teams, season_id, selected_competition_id)
-away_options = away_teams
-
 home_selector = st.sidebar.selectbox(label="Home Team:", options=home_options)
-# remove the selected home_team from the list of away_teams
-if home_selector in away_options:
-    away_options.remove(home_selector)
+# only the teams the home team hosted, so every pair has a match
+away_options = get_fixture_index(selected_competition_id, season_id).opponents.get(home_selector, [])
 
 away_selector = st.sidebar.selectbox(label="Away Team:", options=away_options)
-
-vis_options = ["Starting XIs", "Cumulative xG", "Player Defensive Actions", "GK Passing Distribution", 
-               "Player Pass Maps", "Pass Matrix", "Pass Network", "Passes Leading to Shots"]
+match_found = get_match_id(selected_competition_id, season_id, home_selector, away_selector) is not None
+if not match_found:
+    st.sidebar.warning(f"{home_selector} did not host {away_selector} this season")
+else:
+    pair_fixtures = get_fixture_index(selected_competition_id, season_id).fixtures[(home_selector, away_selector)]
+    if len(pair_fixtures) > 1:
+        st.sidebar.info(f"{home_selector} hosted {away_selector} {len(pair_fixtures)} times this season, "
+                        f"showing the match of {pair_fixtures[-1].match_date}")
+
+vis_options = ["Starting XIs", "Cumulative xG", "Player Defensive Actions", "Team Defensive Actions",
+               "GK Passing Distribution", "Player Pass Maps", "Pass Matrix", "Pass Network", "Passes Leading to Shots"]
 visualisation_options = st.sidebar.selectbox(label="Visual:", options=vis_options)
 
-selected_visualisation = None
+# Widgets only describe the visual, nothing is fetched or plotted until Apply Filters is clicked
+params = {}
 
 if visualisation_options == "Starting XIs":
-    teams = st.sidebar.radio(label="Home/Away", options=["Home", "Away"])
-    if teams == "Home":
-        h_starting = get_home_formation(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector)
-    if teams == "Away":
-        a_starting = get_away_formation(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector)
-elif visualisation_options == "Pass Matrix":
-    matrix = pass_matrix(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector)
-elif visualisation_options == "Cumulative xG":
-    selected_visualisation = cumulative_xg(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector)
-elif visualisation_options == "Player Defensive Actions":
+    params["side"] = st.sidebar.radio(label="Home/Away", options=["Home", "Away"])
+elif match_found and visualisation_options == "Player Defensive Actions":
     players = player_list(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector)[1]
-    player_select = st.sidebar.selectbox(label="Player:", options=players)
-    if player_select:
-        selected_visualization = defensive_actions(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector, player=player_select)
-elif visualisation_options == "GK Passing Distribution":
-    selected_visualisation = gk_passmap(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector)
-elif visualisation_options == "Player Pass Maps":
-    selected_visualisation = team_pass_maps(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector)
-elif visualisation_options == "Pass Network":
+    params["player"] = st.sidebar.selectbox(label="Player:", options=players)
+elif match_found and visualisation_options == "Pass Network":
     formations = get_formations(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector)
-    formation_select = st.sidebar.selectbox(label="Formation:", options=formations)
-    if formation_select:
-        selected_visualisation = pass_network(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector, formation=formation_select)
-elif visualisation_options == "Passes Leading to Shots":
-    selected_visualisation = passes_leading_to_shots(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector)    
+    params["formation"] = st.sidebar.selectbox(label="Formation:", options=formations)
+
+render_request = RenderRequest(visualisation_options, int(selected_competition_id), season_id,
+                               home_selector, away_selector, tuple(params.items()))
 
 # Add a button to trigger the page update
-update_button = st.sidebar.button("Apply Filters")
+update_button = st.sidebar.button("Apply Filters", disabled=not match_found)
 #endregion ---------------------------------------- #
     
 # Text & Links
@@ -285,21 +246,8 @@ with tab1:
     
     # Competitions Table
     #region  ----------------------------------------- #
-    def get_competition_table():
-        """
-        Fetches a table of available competition IDs.
-
-        This function uses the Sbopen parser to retrieve a table of competition data. 
-
-        Returns:
-            pandas.DataFrame: A DataFrame containing competition IDs and related information.
-        """
-        parser = Sbopen()
-        table = parser.competition()
-        
-        return table
-    
-    comp_table = get_competition_table()
+    # served from the in-memory catalog, nothing is read on a rerun
+    comp_table = catalog.competitions
     st.markdown('<span style="font-size:30px; color:red">Statsbomb</span> Competitions', unsafe_allow_html=True)
     st.dataframe(comp_table)
     #endregion ---------------------------------------- #
@@ -312,11 +260,28 @@ with tab2:
     # Tab Content
     #region  ----------------------------------------- #
     if update_button:
-        with st.spinner(text="Updating..."):   
-            scoreline = get_scoreline(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector)
+        st.session_state["applied_request"] = render_request
+    applied_request = st.session_state.get("applied_request")
+
+    if applied_request is not None:
+        # only requests that are rendered anew are traced, not the reruns of every widget change
+        new_request = st.session_state.get("rendered_request") != applied_request
+        request_tracer = trace(applied_request.visual, **applied_request._asdict()) if new_request else nullcontext()
+        with st.spinner(text="Updating..."), request_tracer as request_trace:   
+            scoreline = get_scoreline(applied_request.competition_id, applied_request.season_id,
+                                      home_team=applied_request.home_team, away_team=applied_request.away_team)
             sl = st.header(scoreline, anchor=None)
-
-        if visualisation_options == "Pass Matrix":
+            # figures are drawn in a worker process, the page is updated while waiting so a new
+            # selection stops this run and cancels the render
+            render_status = st.empty()
+            selected_visualisation = await_render(
+                applied_request, st.session_state,
+                on_wait=lambda seconds: render_status.caption(f"Rendering {applied_request.visual}... {seconds:.0f}s"))
+            render_status.empty()
+        if request_trace is not None:
+            st.session_state["last_trace"] = request_trace
+
+        if applied_request.visual == "Pass Matrix":
             def render_dataframe(dataframe):
                 # Convert the DataFrame to HTML
                 dataframe_html = dataframe.to_html(classes='data', index=False, border=0)
@@ -329,19 +294,48 @@ with tab2:
 
                 return styled_html
 
-            st.markdown(render_dataframe(matrix), unsafe_allow_html=True)
+            st.markdown(render_dataframe(selected_visualisation), unsafe_allow_html=True)
         
-        if visualisation_options == "Passes Leading to Shots":
-            goals_dataframe = get_goals_data(selected_competition_id, season_id, home_team=home_selector, away_team=away_selector)
+        elif applied_request.visual == "Passes Leading to Shots":
+            goals_dataframe = get_goals_data(applied_request.competition_id, applied_request.season_id,
+                                             home_team=applied_request.home_team, away_team=applied_request.away_team)
             goals = st.dataframe(goals_dataframe)
-            passes_leading_shots = st.pyplot(selected_visualisation)
+            passes_leading_shots = st.image(selected_visualisation, use_column_width=True)
 
         else:
-            sv = st.pyplot(selected_visualisation)
-            st.set_option("deprecation.showPyplotGlobalUse", False)
+            sv = st.image(selected_visualisation, use_column_width=True)
+
+        team_stats, player_stats = get_stats_tables(applied_request.competition_id, applied_request.season_id,
+                                                    home_team=applied_request.home_team, away_team=applied_request.away_team)
+        with st.expander("Match Stats"):
+            st.dataframe(team_stats, hide_index=True)
+            st.dataframe(player_stats, hide_index=True)
 
     else:
         st.success("Select a fixture in the sidebar, don't forget to click Apply Filters!")
     #endregion ---------------------------------------- #
 #endregion ---------------------------------------- #
 
+# Debug Panel, only with ?debug=1 in the URL, the timings also need SB_PROFILE set
+#region  ----------------------------------------- #
+debug = "debug" in st.experimental_get_query_params()
+if debug:
+    with st.sidebar.expander("Cache"):
+        footprint = cache_report()
+        st.caption(f"{footprint['bytes'].sum() / 2**20:.1f} of {footprint.attrs['budget_bytes'] / 2**20:.0f} MB, "
+                   f"{footprint.attrs['policy'].upper()} eviction")
+        st.dataframe(footprint, hide_index=True)
+
+if debug and PROFILE:
+    with st.sidebar.expander("Timings", expanded=True):
+        last_trace = st.session_state.get("last_trace")
+        if last_trace is None:
+            st.caption("Apply a filter to time a request.")
+        else:
+            st.caption(f"{last_trace['label']}: {last_trace['ms']:.0f} ms")
+            st.dataframe(pd.DataFrame(list(last_trace["stages"].items()), columns=["stage", "ms"]), hide_index=True)
+            st.dataframe(pd.DataFrame(last_trace["spans"]), hide_index=True)
+            if "profile" in last_trace:
+                st.code(last_trace["profile"], language=None)
+#endregion ---------------------------------------- #
+
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "functions"))
+import get_fixture_index as fixture_index_module
+from get_fixture_index import get_fixture_index, team_match_ids
+from get_match_id import get_match_id
+
+@pytest.fixture
+def matches(monkeypatch):
+    """
+    A season where Home hosts Away twice, the later match listed first in the match table.
+    """
+    table = pd.DataFrame({
+        "match_id": [3, 1, 2],
+        "home_team_name": ["Home", "Home", "Away"],
+        "away_team_name": ["Away", "Away", "Home"],
+        "home_score": [2, 0, 1],
+        "away_score": [1, 0, 1],
+        "match_date": ["2016-05-01", "2015-09-01", "2016-01-01"],
+    })
+    monkeypatch.setattr(fixture_index_module, "load_matches", lambda competition_id, season_id: table)
+    get_fixture_index.cache_clear()
+    yield table
+    get_fixture_index.cache_clear()
+
+def test_pairs_that_met_twice_keep_both_matches(matches):
+    index = get_fixture_index(2, 1)
+
+    assert [fixture.match_id for fixture in index.fixtures[("Home", "Away")]] == [1, 3]
+    assert index.opponents == {"Home": ["Away"], "Away": ["Home"]}
+    assert sorted(team_match_ids(2, 1, "Home")) == [1, 2, 3]
+
+def test_get_match_id_picks_the_latest_match(matches):
+    assert get_match_id(2, 1, "Home", "Away") == 3
+    assert get_match_id(2, 1, "Away", "Home") == 2
+    assert get_match_id(2, 1, "Home", "Home") is None
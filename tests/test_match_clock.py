@@ -0,0 +1,63 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "functions"), os.path.join(ROOT, "visualisations")]
+from get_derived_tables import match_clock
+from cumulative_xg import cumulative_xg_curves
+
+MATCH_ID = 1000
+
+def make_events():
+    """
+    Events of a two period match. The first half runs to 47:30, and the second half restarts the minute at 45,
+    so without the shift the two halves overlap by two and a half minutes.
+    """
+    rows = [
+        # period, minute, second, team_name, type_name, shot_statsbomb_xg
+        (1, 0, 0, "Home", "Pass", np.nan),
+        (1, 20, 0, "Home", "Shot", 0.1),
+        (1, 46, 10, "Home", "Shot", 0.2),
+        (1, 47, 30, "Away", "Shot", 0.3),
+        (2, 45, 0, "Home", "Shot", 0.4),
+        (2, 45, 30, "Home", "Shot", 0.05),
+        (2, 70, 0, "Away", "Pass", np.nan),
+        (2, 93, 0, "Home", "Shot", np.nan),
+    ]
+    events = pd.DataFrame(rows, columns=["period", "minute", "second", "team_name", "type_name",
+                                         "shot_statsbomb_xg"])
+    events["match_id"] = MATCH_ID
+
+    return events
+
+def test_match_clock_is_continuous_across_half_time():
+    events = make_events()
+
+    clock = match_clock(events)
+
+    first_half, second_half = clock[events["period"] == 1], clock[events["period"] == 2]
+    # the second half starts where the first half ended, stoppage time included
+    assert first_half.max() == second_half.min() == 47.5
+    assert clock.is_monotonic_increasing
+    assert clock.iloc[-1] == 95.5
+
+def test_cumulative_xg_steps_at_the_period_boundary():
+    events = make_events()
+    events["clock"] = match_clock(events)
+    shots = events[events["type_name"] == "Shot"]
+
+    minutes, curves = cumulative_xg_curves(shots, "Home", [MATCH_ID, MATCH_ID + 1], end=96)
+    curve = dict(zip(minutes, curves[0]))
+
+    assert np.isclose(curve[20], 0.1)
+    # the first half stoppage time shot is at 46.17 on the clock
+    assert np.isclose(curve[46], 0.1)
+    assert np.isclose(curve[47], 0.3)
+    # the second half kick off shot is at 47.5, the one 30 seconds later lands exactly on minute 48
+    assert np.isclose(curve[48], 0.75)
+    assert np.isclose(curves[0, -1], shots.loc[shots["team_name"] == "Home", "shot_statsbomb_xg"].sum())
+    # a match without shots is flat
+    assert not curves[1].any()
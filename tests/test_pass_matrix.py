@@ -0,0 +1,66 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "functions"), os.path.join(ROOT, "visualisations")]
+from pass_matrix import pass_counts
+
+def make_passes():
+    """
+    Completed passes between three players over two formations, with one pass whose formation is unknown and
+    one pass without a recipient.
+    """
+    rows = [
+        (1, "Ann", 2, "Bea", "442"),
+        (1, "Ann", 2, "Bea", "442"),
+        (2, "Bea", 1, "Ann", "442"),
+        (2, "Bea", 3, "Cat", "433"),
+        (3, "Cat", 1, "Ann", "433"),
+        (3, "Cat", 1, "Ann", "433"),
+        (3, "Cat", 1, "Ann", "433"),
+        (1, "Ann", 3, "Cat", None),
+        (2, "Bea", np.nan, None, "433"),
+    ]
+
+    return pd.DataFrame(rows, columns=["player_id", "player_name", "pass_recipient_id", "pass_recipient_name",
+                                       "tactics_formation"])
+
+def expected_counts(passes, by):
+    """
+    The same counts with a plain groupby, keyed by (slice, passer, recipient).
+    """
+    passes = passes.dropna(subset=["pass_recipient_id"] + ([by] if by else []))
+    keys = ([by] if by else []) + ["player_name", "pass_recipient_name"]
+
+    return passes.groupby(keys).size().to_dict()
+
+def as_dict(counts, players, slices, by):
+    result = {}
+    for s, p, r in zip(*np.nonzero(counts)):
+        key = (players[p], players[r]) if by is None else (slices[s], players[p], players[r])
+        result[key] = counts[s, p, r]
+
+    return result
+
+def test_pass_counts_match_groupby():
+    passes = make_passes()
+
+    counts, players, slices = pass_counts(passes)
+
+    assert counts.shape == (1, 3, 3)
+    assert sorted(players) == ["Ann", "Bea", "Cat"]
+    assert as_dict(counts, players, slices, None) == expected_counts(passes, None)
+
+def test_pass_counts_by_slice_leave_out_missing_values():
+    passes = make_passes()
+
+    counts, players, slices = pass_counts(passes, by="tactics_formation")
+
+    assert list(slices) == ["433", "442"]
+    assert as_dict(counts, players, slices, "tactics_formation") == expected_counts(passes, "tactics_formation")
+    # the pass with no formation is in neither slice
+    assert counts.sum() == 7
+    assert counts[:, list(players).index("Ann"), list(players).index("Cat")].sum() == 0
@@ -0,0 +1,89 @@
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import sys
+
+import pytest
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "functions"), os.path.join(ROOT, "benchmarks")]
+import data_store
+from get_derived_tables import DERIVED_TABLES, DERIVED_VERSION
+from prefetch_season import prefetch_season
+from synthetic_fixtures import write_season
+
+COMPETITION_ID = 2
+SEASON_ID = 1
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def open_data_server(tmp_path):
+    """
+    Serves a synthetic season in the open-data layout over HTTP, with the events of its last match missing.
+
+    Yields:
+        tuple: The base URL of the served "data/" folder, the IDs of the served matches and the ID of the
+        match without events.
+    """
+    served_dir = str(tmp_path / "served")
+    write_season(served_dir, COMPETITION_ID, SEASON_ID, num_teams=2, num_events=300)
+    match_ids = sorted(int(name[:-len(".json")]) for name in os.listdir(os.path.join(served_dir, "events")))
+    missing_id = match_ids[-1]
+    os.remove(os.path.join(served_dir, "events", f"{missing_id}.json"))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=served_dir))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/", match_ids, missing_id
+    finally:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def local_store(tmp_path, monkeypatch):
+    """
+    Points the Parquet store and the local open-data clone at empty folders.
+    """
+    monkeypatch.setattr(data_store, "STORE_DIR", str(tmp_path / "store"))
+    monkeypatch.setattr(data_store, "OPEN_DATA_DIR", str(tmp_path / "open-data"))
+    monkeypatch.setattr(data_store, "OFFLINE", False)
+
+def test_prefetch_season_populates_store(open_data_server, local_store):
+    base_url, match_ids, missing_id = open_data_server
+
+    done, failed = prefetch_season(COMPETITION_ID, SEASON_ID, max_workers=2, base_url=base_url)
+
+    stored_ids = [match_id for match_id in match_ids if match_id != missing_id]
+    assert sorted(done) == stored_ids
+    assert list(failed) == [missing_id]
+    assert isinstance(failed[missing_id], requests.HTTPError)
+
+    assert os.path.exists(data_store.open_data_path("matches", COMPETITION_ID, SEASON_ID))
+    assert os.path.exists(data_store.table_path("matches", f"{COMPETITION_ID}_{SEASON_ID}"))
+    for match_id in stored_ids:
+        assert os.path.exists(data_store.open_data_path("events", match_id))
+        assert os.path.exists(data_store.open_data_path("lineups", match_id))
+        assert os.path.exists(data_store.table_path("lineups", match_id))
+        for name in data_store.EVENT_TABLES:
+            assert os.path.exists(data_store.table_path("events", match_id, name))
+        for name in DERIVED_TABLES:
+            assert os.path.exists(data_store.table_path("events", match_id, f"derived_v{DERIVED_VERSION}", name))
+
+    assert not os.path.exists(data_store.open_data_path("events", missing_id))
+    assert not os.path.exists(data_store.table_path("events", missing_id, "events"))
+
+def test_prefetch_season_skips_downloaded_files(open_data_server, local_store):
+    base_url, match_ids, missing_id = open_data_server
+    prefetch_season(COMPETITION_ID, SEASON_ID, max_workers=2, base_url=base_url)
+
+    # files already in the local clone are not fetched again, so a dead server only fails the missing match
+    done, failed = prefetch_season(COMPETITION_ID, SEASON_ID, max_workers=2, base_url="http://127.0.0.1:9/")
+
+    assert sorted(done) == [match_id for match_id in match_ids if match_id != missing_id]
+    assert list(failed) == [missing_id]
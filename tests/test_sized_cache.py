@@ -0,0 +1,84 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "functions"))
+import sized_cache as sized_cache_module
+from sized_cache import sized_cache
+
+# every cached value is an array of this many bytes, the budget holds two of them
+VALUE_BYTES = 1000
+BUDGET_BYTES = 2500
+
+@pytest.fixture
+def budget(monkeypatch):
+    """
+    Gives the test its own registry of caches and a budget of BUDGET_BYTES, returns a function setting the policy.
+    """
+    monkeypatch.setattr(sized_cache_module, "_caches", {})
+    monkeypatch.setattr(sized_cache_module, "CACHE_BUDGET_BYTES", BUDGET_BYTES)
+
+    def set_policy(policy):
+        monkeypatch.setattr(sized_cache_module, "CACHE_POLICY", policy)
+
+    return set_policy
+
+def make_cached(cache_name, calls):
+    @sized_cache(name=cache_name)
+    def load(key):
+        calls.append((cache_name, key))
+        return np.zeros(VALUE_BYTES, dtype=np.uint8)
+
+    return load
+
+def fill(load):
+    # "a" is used three times but before "b" was added, so LRU and LFU disagree on which one goes
+    load("a")
+    load("a")
+    load("a")
+    load("b")
+    load("c")
+
+@pytest.mark.parametrize("policy, evicted, kept", [("lru", "a", "b"), ("lfu", "b", "a")])
+def test_evicts_by_policy(budget, policy, evicted, kept):
+    budget(policy)
+    calls = []
+    load = make_cached("load", calls)
+
+    fill(load)
+
+    info = load.cache_info()
+    assert info["entries"] == 2
+    assert info["bytes"] <= BUDGET_BYTES
+    assert info["evictions"] == 1
+
+    calls.clear()
+    load(kept)
+    load("c")
+    assert calls == []
+    load(evicted)
+    assert calls == [("load", evicted)]
+
+def test_budget_is_shared_between_caches(budget):
+    budget("lru")
+    calls = []
+    first, second = make_cached("first", calls), make_cached("second", calls)
+
+    first("a")
+    second("a")
+    first("b")
+
+    # the oldest entry of any cache makes room, the new entry is always kept
+    assert first.cache_info()["entries"] == 1
+    assert second.cache_info()["entries"] == 1
+    assert sized_cache_module.cache_report()["bytes"].sum() <= BUDGET_BYTES
+
+    calls.clear()
+    second("a")
+    first("b")
+    assert calls == []
+    first("a")
+    assert calls == [("first", "a")]
@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import matplotlib
+matplotlib.use("Agg")
+import sys
+
+sys.path.insert(0, "functions/")
+from data_store import STORE_DIR
+from figure_cache import figure_cache_key
+from get_fixture_index import get_fixture_index
+from get_formation_segments import get_formations
+from player_list import player_list
+
+sys.path.insert(0, "visualisations/")
+from render_scheduler import RenderRequest, VISUALS, TABLE_VISUALS, render_image
+
+# default number of processes, each renders whole fixtures so match data is loaded once per fixture
+MAX_WORKERS = os.cpu_count() or 1
+
+# default folder for the rendered images and the manifest
+OUTPUT_DIR = os.path.join(STORE_DIR, "renders")
+
+def visual_params(visual, competition_id, season_id, home_team, away_team):
+    """
+    Lists every selection the sidebar offers for a visual and fixture.
+
+    Args:
+        visual (str): The visual name, a key of render_scheduler.VISUALS.
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+        home_team (str): The name of the home team.
+        away_team (str): The name of the away team.
+
+    Returns:
+        list: One dict of parameters per render, an empty dict for visuals without parameters.
+    """
+    if visual == "Starting XIs":
+        return [{"side": side} for side in ["Home", "Away"]]
+    if visual == "Player Defensive Actions":
+        players = player_list(competition_id, season_id, home_team=home_team, away_team=away_team)[1]
+        return [{"player": player} for player in players]
+    if visual == "Pass Network":
+        formations = get_formations(competition_id, season_id, home_team=home_team, away_team=away_team)
+        return [{"formation": formation} for formation in formations]
+
+    return [{}]
+
+def render_fixture(competition_id, season_id, home_team, away_team, visuals, output_dir):
+    """
+    Renders the chosen visuals of one fixture for every parameter, warming the figure cache on the way.
+
+    Args:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+        home_team (str): The name of the home team.
+        away_team (str): The name of the away team.
+        visuals (list): The visual names to render.
+        output_dir (str): Folder the images (.png) and tables (.html) are written to.
+
+    Returns:
+        list: One manifest entry (dict) per render, with the error message of the renders that failed.
+    """
+    entries = []
+    for visual in visuals:
+        try:
+            all_params = visual_params(visual, competition_id, season_id, home_team, away_team)
+        except Exception as e:
+            entries.append({"visual": visual, "home_team": home_team, "away_team": away_team,
+                            "params": None, "path": None, "seconds": 0.0, "error": repr(e)})
+            continue
+
+        for params in all_params:
+            request = RenderRequest(visual, competition_id, season_id, home_team, away_team, tuple(params.items()))
+            key = figure_cache_key(*request)
+            entry = {"visual": visual, "home_team": home_team, "away_team": away_team, "params": params,
+                     "path": None, "seconds": 0.0, "error": None}
+            start = time.perf_counter()
+            try:
+                if visual in TABLE_VISUALS:
+                    path = os.path.join(output_dir, f"{key}.html")
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(VISUALS[visual](request).to_html())
+                else:
+                    path = os.path.join(output_dir, f"{key}.png")
+                    with open(path, "wb") as f:
+                        f.write(render_image(request))
+                entry["path"] = os.path.relpath(path, output_dir)
+            except Exception as e:
+                entry["error"] = repr(e)
+            entry["seconds"] = round(time.perf_counter() - start, 3)
+            entries.append(entry)
+
+    return entries
+
+def batch_render(competition_id, season_id, visuals=None, max_workers=MAX_WORKERS, output_dir=OUTPUT_DIR):
+    """
+    Renders the chosen visuals for every fixture of a competition season and writes a manifest.
+
+    Args:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+        visuals (list, optional): The visual names to render, all of them when not given.
+        max_workers (int): Number of fixtures rendered at the same time.
+        output_dir (str): Folder the images, tables and manifest.json are written to.
+
+    Returns:
+        dict: The manifest, with one entry per render in "renders".
+    """
+    visuals = list(VISUALS) if visuals is None else visuals
+    unknown = [visual for visual in visuals if visual not in VISUALS]
+    if unknown:
+        raise ValueError(f"unknown visuals {unknown}, choose from {list(VISUALS)}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    fixtures = list(get_fixture_index(competition_id, season_id).fixtures)
+
+    start = time.perf_counter()
+    entries = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(render_fixture, competition_id, season_id, home, away, visuals, output_dir)
+                   for home, away in fixtures]
+        for future in as_completed(futures):
+            entries.extend(future.result())
+
+    entries.sort(key=lambda entry: (entry["home_team"], entry["away_team"], visuals.index(entry["visual"])))
+    manifest = {"competition_id": competition_id, "season_id": season_id, "visuals": visuals,
+                "fixtures": len(fixtures), "seconds": round(time.perf_counter() - start, 3),
+                "renders": entries}
+
+    path = os.path.join(output_dir, "manifest.json")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    return manifest
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Render visuals for every fixture of a competition season "
+                                                     "and warm the figure cache.")
+    arg_parser.add_argument("competition_id", type=int)
+    arg_parser.add_argument("season_id", type=int)
+    arg_parser.add_argument("--visuals", nargs="+", choices=list(VISUALS), default=None,
+                            help="visuals to render, all of them by default")
+    arg_parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    arg_parser.add_argument("--output", default=OUTPUT_DIR)
+    args = arg_parser.parse_args()
+
+    manifest = batch_render(args.competition_id, args.season_id, visuals=args.visuals,
+                            max_workers=args.workers, output_dir=args.output)
+    failed = [entry for entry in manifest["renders"] if entry["error"]]
+    print(f"rendered {len(manifest['renders']) - len(failed)} visuals for {manifest['fixtures']} fixtures "
+          f"in {manifest['seconds']}s, {len(failed)} failed")
+    for entry in failed:
+        print(f"  {entry['visual']} {entry['home_team']} v {entry['away_team']} {entry['params']}: {entry['error']}")
+    sys.exit(1 if failed else 0)
@@ -1,17 +1,97 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from matplotlib.colors import to_rgba
-from mplsoccer import Sbopen
 import warnings
 warnings.filterwarnings("ignore")
 
 import sys
 sys.path.insert(0, "functions/")
 from get_match_id import get_match_id
-from get_event_type import get_event_type
+from get_derived_tables import get_derived_tables, match_clock
+from get_fixture_index import team_match_ids
+from map_matches import map_matches
+from profiling import timed
+from sized_cache import sized_cache
+
+sys.path.insert(0, "visualisations/")
+from figures import new_figure
+
+@sized_cache(max_entries=64)
+@timed("transform")
+def shot_timeline(away_team_id):
+    """
+    Get the shots of a match on the continuous match clock, sorted once by (period, minute, second).
+
+    Args:
+        away_team_id (int): The ID of the match.
+
+    Returns:
+        pandas.DataFrame: One row per shot with the match_id, team_name, player_name, outcome_name,
+        shot_statsbomb_xg and clock columns. Penalty shoot-out kicks are excluded. attrs holds the
+        clock at the end of the match ("end") and at the start of the second half ("half_time").
+    """
+    derived = get_derived_tables(away_team_id)
+    shots, periods = derived.shots, derived.periods[derived.periods["period"] < 5]
+
+    shots = shots.loc[(shots["type_name"] == "Shot") & (shots["period"] < 5),
+                      ["match_id", "period", "minute", "second", "team_name", "player_name",
+                       "outcome_name", "shot_statsbomb_xg", "clock"]]
+    shots = shots.sort_values(["period", "minute", "second"], kind="stable").reset_index(drop=True)
+    shots.attrs["end"] = float(periods["end"].max())
+    second_half = periods.loc[periods["period"] == 2, "start"]
+    shots.attrs["half_time"] = float(second_half.iloc[0]) if len(second_half) else 45.0
+
+    return shots
+
+def cumulative_xg_curves(shots, team, match_ids, resolution=1.0, end=None):
+    """
+    Compute the cumulative xG step curve of a team for one or many matches at once.
+
+    Args:
+        shots (pandas.DataFrame): Shots from shot_timeline, concatenated when there are several matches.
+        team (str): The name of the team.
+        match_ids (list): The matches to compute, one curve is returned per match even without shots.
+        resolution (float): Spacing of the curve in minutes.
+        end (float, optional): Last minute of the curve, defaults to the last shot.
+
+    Returns:
+        tuple: A tuple containing:
+            - numpy.ndarray: The minutes the curves are evaluated at.
+            - numpy.ndarray: The cumulative xG, of shape (matches, minutes).
 
-def cumulative_xg(competition_id, season_id, home_team, away_team):
+    Notes:
+        Shots are sorted once by (match, clock) and summed with cumsum. Every curve point is then found with a
+        single searchsorted over keys that combine the match and the clock, so there is no per-interval or per-match
+        filtering.
+    """
+    team_shots = shots[shots["team_name"] == team]
+    codes = pd.Index(match_ids).get_indexer(team_shots["match_id"])
+    clock = team_shots["clock"].to_numpy(dtype=float)
+    xg = team_shots["shot_statsbomb_xg"].fillna(0).to_numpy(dtype=float)
+    keep = codes >= 0
+    codes, clock, xg = codes[keep], clock[keep], xg[keep]
+
+    if end is None:
+        end = clock.max() if len(clock) else 90.0
+    minutes = np.arange(0, end + resolution, resolution)
+
+    order = np.lexsort((clock, codes))
+    codes, clock, xg = codes[order], clock[order], xg[order]
+    total_xg = np.concatenate([[0.0], np.cumsum(xg)])
+
+    # keys are ordered by match first, then clock, as long as span is larger than any clock value
+    span = max(end, clock.max() if len(clock) else 0) + resolution + 1
+    keys = codes * span + clock
+    match_codes = np.arange(len(match_ids))
+    queries = (match_codes[:, None] * span + minutes[None, :]).ravel()
+    shots_so_far = np.searchsorted(keys, queries, side="right").reshape(len(match_ids), len(minutes))
+    shots_before_match = np.searchsorted(codes, match_codes, side="left")
+
+    curves = total_xg[shots_so_far] - total_xg[shots_before_match][:, None]
+
+    return minutes, curves
+
+def cumulative_xg(competition_id, season_id, home_team, away_team, resolution=1.0):
     """
     Generate a plot showing the cumulative expected goals (xG) over time for two teams during a football match.
 
@@ -20,73 +100,89 @@ def cumulative_xg(competition_id, season_id, home_team, away_team):
         season_id (int): The ID of the season.
         home_team (str): The name of the home team.
         away_team (str): The name of the away team.
+        resolution (float): Spacing of the xG curve in minutes.
 
     Returns:
-        None: Saves the plot as "cumulative_xG_plot.png".
+        matplotlib.figure.Figure: The plot.
 
     Dependencies:
-        Requires functions get_match_id, get_event_type, and get_event_df for data retrieval.
+        Requires functions get_match_id and get_derived_tables for data retrieval.
 
     Notes:
-        This function calculates and plots the cumulative xG over intervals of 15 minutes throughout the match.
-        Tactical shifts are marked on the plot for both teams.
+        This function calculates and plots the cumulative xG as a step curve on the match clock, including
+        stoppage time in both halves. Half time is marked on the plot.
 
     Example:
         cumulative_xg(competition_id=123, season_id=456, home_team='TeamA', away_team='TeamB')
 
     """
     away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
-    shot = get_event_type(away_team_id, "Shot")
-
-    def calculate_cumulative_xG(shot_data, team, interval):
-        return shot_data[(shot_data["minute"] <= interval[1]) & 
-                        (shot_data["minute"] > interval[0])][shot_data["team_name"] == team]["shot_statsbomb_xg"].sum()
-
-    def generate_cumulative_xG_array(shot_data, team, intervals):
-        cumulative_xG = [0]
-        for interval in intervals:
-            cumulative_xG.append(cumulative_xG[-1] + calculate_cumulative_xG(shot_data, team, interval))
-        return cumulative_xG
+    shot = shot_timeline(away_team_id)
+    end = max(shot.attrs["end"], 90)
 
     HOME = home_team
     AWAY = away_team
 
-    intervals = [(i, i+15) for i in range(0, 90, 15)]
+    minutes, (home_team_xG,) = cumulative_xg_curves(shot, HOME, [away_team_id], resolution, end)
+    _, (away_team_xG,) = cumulative_xg_curves(shot, AWAY, [away_team_id], resolution, end)
 
-    home_team_xG = [calculate_cumulative_xG(shot, HOME, interval) for interval in intervals]
-    away_team_xG = [calculate_cumulative_xG(shot, AWAY, interval) for interval in intervals]
-    home_team_xG.insert(0, 0) 
-    away_team_xG.insert(0, 0) 
+    goal_home = shot[(shot["outcome_name"] == "Goal") & (shot["team_name"] == HOME)]["clock"].tolist()
+    goal_away = shot[(shot["outcome_name"] == "Goal") & (shot["team_name"] == AWAY)]["clock"].tolist()
 
-    minutes = [0, 15, 30, 45, 60, 75, 90]
+    # the second half starts where the first half (including stoppage time) ended
+    half_time = shot.attrs["half_time"]
 
-    goal_home = shot[(shot["outcome_name"] == "Goal") & (shot["team_name"] == HOME)]["minute"].tolist()
-    goal_away = shot[(shot["outcome_name"] == "Goal") & (shot["team_name"] == AWAY)]["minute"].tolist()
+    # the colours of the dark_background style, set on the figure as a style context would change them for
+    # every thread
+    fig = new_figure(figsize=(12, 7), facecolor="black")
+    ax = fig.subplots()
+    ax.set_facecolor("black")
+    for spine in ax.spines.values():
+        spine.set_color("white")
+    ax.tick_params(colors="white")
 
-    with plt.style.context("dark_background"):
-        plt.figure(figsize=(12, 7))
+    ax.fill_between(minutes, home_team_xG, step="post", color='blue', alpha=0.4, label=HOME)
+    ax.fill_between(minutes, away_team_xG, step="post", color='red', alpha=0.4, label=AWAY)
 
-        plt.fill_between(minutes, home_team_xG, color='blue', alpha=0.4, label=HOME)
-        plt.fill_between(minutes, away_team_xG, color='red', alpha=0.4, label=AWAY)
+    # Plot goals
+    ax.scatter(goal_home, [0] * len(goal_home), color='blue', label=f"{HOME} Goal", s=60, zorder=5, marker="*")
+    ax.scatter(goal_away, [0] * len(goal_away), color='red', label=f"{AWAY} Goal", s=60, zorder=5, marker="*")
 
-        # Plot goals
-        plt.scatter(goal_home, [0] * len(goal_home), color='blue', label=f"{HOME} Goal", s=60, zorder=5, marker="*")
-        plt.scatter(goal_away, [0] * len(goal_away), color='red', label=f"{AWAY} Goal", s=60, zorder=5, marker="*")
-        
-        plt.xlabel('Minute')
-        plt.ylabel('Cumulative xG')
-        
-        plt.grid(False)
-        plt.xticks(range(0, 91, 15))
+    ax.axvline(half_time, color="white", linestyle="--", alpha=0.3)
 
-        plt.legend(loc="upper left")
+    ax.set_xlabel('Minute', color="white")
+    ax.set_ylabel('Cumulative xG', color="white")
 
-        #plt.savefig("cumulative_xG_plot.png")
-        plt.show()
+    ax.grid(False)
+    ax.set_xlim(0, minutes[-1])
+    ax.set_xticks(range(0, int(minutes[-1]) + 1, 15))
 
+    ax.legend(loc="upper left", facecolor="black", labelcolor="white")
 
+    return fig
 
+def season_cumulative_xg(competition_id, season_id, team, resolution=1.0, max_workers=None):
+    """
+    Compute the cumulative xG curve of a team for every match it played in a competition season.
 
+    Args:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+        team (str): The name of the team.
+        resolution (float): Spacing of the xG curves in minutes.
+        max_workers (int, optional): Number of processes loading matches at the same time.
+
+    Returns:
+        pandas.DataFrame: Cumulative xG with one row per minute and one column per match_id.
 
+    Example:
+        season_cumulative_xg(competition_id=2, season_id=27, team='Arsenal')
+    """
+    match_ids = team_match_ids(competition_id, season_id, team)
+    timelines = map_matches(shot_timeline, match_ids, max_workers=max_workers)
 
+    shots = pd.concat(timelines, ignore_index=True)
+    end = max([90] + [timeline.attrs["end"] for timeline in timelines])
+    minutes, curves = cumulative_xg_curves(shots, team, match_ids, resolution, end)
 
+    return pd.DataFrame(curves.T, index=pd.Index(minutes, name="minute"), columns=match_ids)
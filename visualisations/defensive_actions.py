@@ -1,48 +1,83 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from matplotlib.colors import to_rgba
-import matplotlib.lines as mlines
-import matplotlib.patches as mpatches
-import cmasher as cmr
-from PIL import Image
-from urllib.request import urlopen
-from mplsoccer import Sbopen, Pitch, add_image, VerticalPitch
-from scipy.spatial import ConvexHull
-from highlight_text import ax_text
+from matplotlib.lines import Line2D
+from mplsoccer import Pitch
+from scipy.spatial import ConvexHull, QhullError
+from collections import namedtuple
 import warnings
 warnings.filterwarnings("ignore")
 
 import sys
 sys.path.insert(0, "functions/")
 from get_match_id import get_match_id
-from get_event_df import get_event_df
+from get_derived_tables import get_derived_tables
+from profiling import timed
+from sized_cache import sized_cache
 
-def player_list(competition_id, season_id, home_team, away_team):
+sys.path.insert(0, "visualisations/")
+from figures import draw_pitch, pitch_grid
+
+# marker and colour of each defensive action in the team grid
+ACTION_STYLES = {"Block": ("o", "red"), "Foul Committed": ("s", "blue"), "Clearance": ("^", "green"),
+                 "Interception": ("x", "purple")}
+
+# players per row of the team grid
+GRID_COLUMNS = 4
+
+# the defensive actions of a team, split by player with their territory
+DefensiveView = namedtuple("DefensiveView", ["actions", "rows", "territory", "hulls"])
+
+def _hull(points):
+    """
+    Convex hull of a player's action locations, None when they do not span an area.
     """
-    Get a DataFrame containing filtered event data for the home team and a list of unique player names.
+    if len(np.unique(points, axis=0)) < 3:
+        return None
+    try:
+        return ConvexHull(points)
+    except QhullError:
+        return None
+
+@sized_cache(max_entries=64)
+@timed("transform")
+def team_defensive_actions(away_team_id, team):
+    """
+    Split a team's defensive actions in a match by player, with one groupby over the defensive events.
 
     Parameters:
-        competition_id (int): The ID of the competition.
-        season_id (int): The ID of the season.
-        home_team (str): The name of the home team.
-        away_team (str): The name of the away team.
+        away_team_id (int): The ID of the match.
+        team (str): The name of the team.
 
     Returns:
-        tuple: A tuple containing:
-            - DataFrame: Filtered event data for the home team.
-            - list: A list of unique player names.
+        DefensiveView: A named tuple containing:
+            - actions (pandas.DataFrame): The team's blocks, fouls committed, clearances and interceptions.
+            - rows (dict): The row positions in actions of each player's actions, keyed by player name.
+            - territory (pandas.DataFrame): One row per player, most actions first, with the number of actions,
+              their centroid (centroid_x, centroid_y) and the area of their convex hull (0 when the actions do
+              not span an area).
+            - hulls (dict): The hull vertices (an array of x, y rows) of each player with a hull area.
+        It is cached, so switching between players of the same match does not filter the events again.
     """
-    away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
-    df = get_event_df(away_team_id) 
-
-    HOME = home_team
-
-    filt = df[(df["type_name"].isin(["Block", "Foul Committed", "Clearance", "Interception"]))&
-            (df["team_name"] == HOME)].dropna(axis=1)
-
-    players = list(filt["player_name"].unique())
-    return filt, players
+    actions = get_derived_tables(away_team_id).defensive_actions
+    actions = actions[actions["team_name"] == team].reset_index(drop=True)
+
+    grouped = actions.groupby("player_name", observed=True, sort=False)
+    rows = grouped.indices
+    territory = grouped.agg(actions=("x", "size"), centroid_x=("x", "mean"), centroid_y=("y", "mean"))
+    territory.index = territory.index.astype(object)
+
+    points = actions[["x", "y"]].to_numpy(dtype=np.float64)
+    hulls = {}
+    areas = []
+    for player in territory.index:
+        hull = _hull(points[rows[player]])
+        areas.append(0.0 if hull is None else hull.volume)
+        if hull is not None:
+            hulls[player] = hull.points[hull.vertices]
+    territory["hull_area"] = areas
+
+    return DefensiveView(actions, rows, territory.sort_values("actions", ascending=False, kind="stable"), hulls)
 
 def defensive_actions(competition_id, season_id, home_team, away_team, player):
     """
@@ -56,20 +91,20 @@ def defensive_actions(competition_id, season_id, home_team, away_team, player):
         player (str): The name of the player for whom defensive actions are being analyzed.
 
     Returns:
-        None
+        matplotlib.figure.Figure: The plot.
 
     This function generates a scatter plot of defensive actions performed by the specified player. The plot
-    displays different types of defensive actions using distinct symbols and colors. The plot is saved as an
-    image file with a filename based on the player's name.
+    displays different types of defensive actions using distinct symbols and colors.
 
     Example:
         defensive_actions(123, 2022, "Team A", "Team B", "John Doe")
     """
-    filt = player_list(competition_id, season_id, home_team, away_team)[0]
+    away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
+    view = team_defensive_actions(away_team_id, home_team)
 
     AWAY = away_team
 
-    player_df = filt[filt["player_name"] == player].reset_index(drop=True)
+    player_df = view.actions.iloc[view.rows[player]].reset_index(drop=True)
 
     # Create a list of symbols for different type_names
     symbols = ['o', 's', '^', 'x', '+']
@@ -79,11 +114,11 @@ def defensive_actions(competition_id, season_id, home_team, away_team, player):
 
     # Create a Pitch object
     pitch = Pitch(pitch_type="statsbomb", pitch_color="#22312b", line_color="#c7d5cc")
-    fig, ax = pitch.draw()
+    fig, ax = draw_pitch(pitch)
     fig.set_facecolor("#22312b")
 
     # Group the DataFrame by 'type_name'
-    grouped = player_df.groupby('type_name')
+    grouped = player_df.groupby('type_name', observed=True)
 
     # Iterate over the groups and plot the points with different symbols and colors
     for i, (name, group) in enumerate(grouped):
@@ -91,14 +126,74 @@ def defensive_actions(competition_id, season_id, home_team, away_team, player):
         ax.scatter(group['x'], group['y'], label=f"{name}", color=colors[i], marker=symbols[i], s=100)
 
     # Add legend
-    plt.legend()
+    ax.legend()
 
     # Add a title
     name = str(player_df["player_name"][0])
-    plt.title(f"{name} Defensive Actions", c="white")
+    ax.set_title(f"{name} Defensive Actions", c="white")
 
-    #plt.savefig(f"{name} Defensive Actions.png")
-    plt.show()
+    return fig
 
+def draw_team_defensive_actions(view, title):
+    """
+    Draw a small multiple of every player's defensive actions, with the convex hull and centroid of each.
 
+    Parameters:
+        view (DefensiveView): The team's actions from team_defensive_actions.
+        title (str): The title of the plot.
+
+    Returns:
+        matplotlib.figure.Figure: The plot.
+    """
+    players = list(view.territory.index)
+    ncols = max(1, min(GRID_COLUMNS, len(players)))
+    nrows = max(1, -(-len(players) // ncols))
+
+    pitch = Pitch(pitch_type="statsbomb", pitch_color="#22312b", line_color="#c7d5cc", linewidth=1)
+    fig, axs = pitch_grid(pitch, nrows=nrows, ncols=ncols, figheight=3 * nrows + 1.5, grid_height=0.84, space=0.25,
+                          title_height=0.08, title_space=0.04, endnote_height=0, endnote_space=0, axis=False)
+    fig.set_facecolor("#22312b")
+    pitch_axs = np.atleast_1d(axs["pitch"]).ravel()
+
+    for ax, (player, territory) in zip(pitch_axs, view.territory.iterrows()):
+        player_actions = view.actions.iloc[view.rows[player]]
+        if player in view.hulls:
+            pitch.polygon([view.hulls[player]], ax=ax, facecolor="#c7d5cc", edgecolor="#c7d5cc", alpha=0.25)
+        for type_name, (marker, color) in ACTION_STYLES.items():
+            of_type = player_actions[player_actions["type_name"] == type_name]
+            pitch.scatter(of_type["x"], of_type["y"], ax=ax, marker=marker, color=color, s=25)
+        pitch.scatter(territory["centroid_x"], territory["centroid_y"], ax=ax, marker="*", color="gold",
+                      edgecolors="black", s=150, zorder=3)
+        ax.set_title(f"{player}\n{territory['actions']:.0f} actions, hull {territory['hull_area']:.0f}",
+                     c="white", fontsize=8)
+
+    # hide the unused cells of the last row
+    for ax in pitch_axs[len(players):]:
+        ax.remove()
+
+    handles = [Line2D([], [], linestyle="", marker=marker, color=color, label=type_name)
+               for type_name, (marker, color) in ACTION_STYLES.items()]
+    handles.append(Line2D([], [], linestyle="", marker="*", color="gold", markersize=10, label="Centroid"))
+    axs["title"].text(0.5, 0.8, title, color="white", ha="center", va="center", fontsize=16)
+    axs["title"].legend(handles=handles, loc="lower center", bbox_to_anchor=(0.5, -0.2), ncol=len(handles),
+                        frameon=False, labelcolor="white", fontsize=8)
+
+    return fig
+
+def team_defensive_map(competition_id, season_id, home_team, away_team):
+    """
+    Generate a grid of the home team's players with their defensive actions, hull and centroid.
+
+    Parameters:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+        home_team (str): The name of the home team.
+        away_team (str): The name of the away team.
+
+    Returns:
+        matplotlib.figure.Figure: The plot.
+    """
+    away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
+    view = team_defensive_actions(away_team_id, home_team)
 
+    return draw_team_defensive_actions(view, f"{home_team} Defensive Actions vs {away_team}")
@@ -0,0 +1,104 @@
+import numpy as np
+from functools import lru_cache
+
+import sys
+sys.path.insert(0, "functions/")
+from get_event_columns import get_event_columns
+from profiling import timed
+from sized_cache import sized_cache
+
+# statsbomb pitch dimensions in yards
+PITCH_LENGTH = 120
+PITCH_WIDTH = 80
+
+# one bin per yard, smoothed with a gaussian of SIGMA yards
+BINS = (120, 80)
+SIGMA = 5.0
+
+# columns read for a density, the event types are chosen by the caller
+EVENT_COLUMNS = ["team_name", "x", "y"]
+
+@lru_cache(maxsize=8)
+def _kernel_matrix(num_bins, sigma_bins):
+    """
+    Gaussian smoothing along one axis as a matrix. Columns sum to one so no mass is lost at the touchlines.
+    """
+    centres = np.arange(num_bins)
+    kernel = np.exp(-0.5 * ((centres[:, None] - centres[None, :]) / sigma_bins) ** 2)
+
+    return kernel / kernel.sum(axis=0, keepdims=True)
+
+def binned_density(x, y, bins=BINS, sigma=SIGMA):
+    """
+    Estimate the density of event locations on the pitch.
+
+    Args:
+        x (array-like): Event x coordinates, in statsbomb units.
+        y (array-like): Event y coordinates, in statsbomb units.
+        bins (tuple): Number of bins along the length and width of the pitch.
+        sigma (float): Standard deviation of the gaussian smoothing, in yards.
+
+    Returns:
+        numpy.ndarray: The density of shape bins, indexed [x bin, y bin], summing to one (all zeros without events).
+
+    Notes:
+        Locations are counted into a grid with a single bincount and then smoothed with a separable gaussian,
+        applied as one matrix product per axis. The cost depends on the grid size rather than the number of events,
+        so it scales to season long touch maps.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    inside = np.isfinite(x) & np.isfinite(y)
+
+    num_x, num_y = bins
+    ix = np.clip((x[inside] * num_x / PITCH_LENGTH).astype(int), 0, num_x - 1)
+    iy = np.clip((y[inside] * num_y / PITCH_WIDTH).astype(int), 0, num_y - 1)
+    counts = np.bincount(ix * num_y + iy, minlength=num_x * num_y).reshape(num_x, num_y).astype(float)
+
+    kernel_x = _kernel_matrix(num_x, sigma * num_x / PITCH_LENGTH)
+    kernel_y = _kernel_matrix(num_y, sigma * num_y / PITCH_WIDTH)
+    density = kernel_x @ counts @ kernel_y.T
+
+    total = density.sum()
+    if total > 0:
+        density /= total
+
+    return density
+
+@sized_cache(max_entries=64)
+@timed("transform")
+def event_density(away_team_id, team, type_name, bins=BINS, sigma=SIGMA):
+    """
+    Cached density of a team's event locations in a match, see binned_density.
+
+    Args:
+        away_team_id (int): The ID of the match.
+        team (str): The name of the team.
+        type_name (str): The event type, e.g. "Ball Receipt".
+        bins (tuple): Number of bins along the length and width of the pitch.
+        sigma (float): Standard deviation of the gaussian smoothing, in yards.
+
+    Returns:
+        numpy.ndarray: The density of shape bins, indexed [x bin, y bin].
+    """
+    events = get_event_columns(away_team_id, EVENT_COLUMNS, [type_name])
+    located = events.loc[events["team_name"] == team, ["x", "y"]]
+
+    return binned_density(located["x"], located["y"], bins=bins, sigma=sigma)
+
+def plot_density(density, ax, **kwargs):
+    """
+    Draw a density from binned_density on a statsbomb pitch axis.
+
+    Args:
+        density (numpy.ndarray): The density, indexed [x bin, y bin].
+        ax (matplotlib.axes.Axes): The pitch axis.
+        **kwargs: Passed on to matplotlib.axes.Axes.pcolormesh, e.g. cmap.
+
+    Returns:
+        matplotlib.collections.QuadMesh: The heatmap.
+    """
+    x_edges = np.linspace(0, PITCH_LENGTH, density.shape[0] + 1)
+    y_edges = np.linspace(0, PITCH_WIDTH, density.shape[1] + 1)
+
+    return ax.pcolormesh(x_edges, y_edges, density.T, shading="flat", **kwargs)
@@ -0,0 +1,59 @@
+import threading
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# pitch.grid can only create its figure through pyplot, whose figure registry is shared by every thread
+_pyplot_lock = threading.Lock()
+
+def new_figure(**kwargs):
+    """
+    Creates a figure drawn with the Agg backend, without registering it with pyplot.
+
+    Args:
+        **kwargs: Passed on to matplotlib.figure.Figure, e.g. figsize.
+
+    Returns:
+        matplotlib.figure.Figure: The figure. It is only referenced by the caller, so figures built in
+        different threads never share state and are freed once encoded.
+    """
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+
+    return fig
+
+def draw_pitch(pitch, figsize=None):
+    """
+    Draws a pitch on a new figure, like pitch.draw() without pyplot.
+
+    Args:
+        pitch (mplsoccer.Pitch or mplsoccer.VerticalPitch): The pitch to draw.
+        figsize (tuple, optional): The figure size in inches.
+
+    Returns:
+        tuple: The figure and the pitch axis.
+    """
+    fig = new_figure(figsize=figsize, tight_layout=True)
+    ax = fig.subplots()
+    pitch.draw(ax=ax)
+
+    return fig, ax
+
+def pitch_grid(pitch, **kwargs):
+    """
+    Creates a grid of pitches with pitch.grid() and detaches its figure from pyplot.
+
+    Args:
+        pitch (mplsoccer.Pitch or mplsoccer.VerticalPitch): The pitch to draw.
+        **kwargs: Passed on to pitch.grid, e.g. nrows, ncols and figheight.
+
+    Returns:
+        tuple: The figure and the dict of axes returned by pitch.grid.
+    """
+    import matplotlib.pyplot as plt
+
+    with _pyplot_lock:
+        fig, axs = pitch.grid(**kwargs)
+        plt.close(fig)
+    FigureCanvasAgg(fig)
+
+    return fig, axs
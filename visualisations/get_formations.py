@@ -1,15 +1,15 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-from mplsoccer import Sbopen, Pitch, VerticalPitch
+from mplsoccer import VerticalPitch
 import warnings
 warnings.filterwarnings("ignore")
 
 import sys
 sys.path.insert(0, "functions/")
 from get_match_id import get_match_id
-from get_event_df import get_event_df
-from get_tactics_df import get_tactics_df
+from get_derived_tables import get_derived_tables
 
+sys.path.insert(0, "visualisations/")
+from figures import draw_pitch
 
 def get_home_formation(competition_id, season_id, home_team, away_team):
     """
@@ -22,10 +22,10 @@ def get_home_formation(competition_id, season_id, home_team, away_team):
         away_team (str): The name of the away team.
 
     Returns:
-        None: Displays the formation on a football pitch.
+        matplotlib.figure.Figure: The formation on a football pitch.
 
     Dependencies:
-        Requires functions get_match_id, get_event_df, and get_tactics_df for data retrieval.
+        Requires functions get_match_id and get_derived_tables for data retrieval.
         Uses the VerticalPitch class for pitch visualization.
 
     Notes:
@@ -36,19 +36,15 @@ def get_home_formation(competition_id, season_id, home_team, away_team):
         get_home_formation(competition_id=123, season_id=456, home_team='TeamA', away_team='TeamB')
     """
     away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
-    event = get_event_df(away_team_id)
-    tactics = get_tactics_df(away_team_id)
+    starting_xi = get_derived_tables(away_team_id).starting_xi
 
     HOME = home_team
 
-    starting_xi_event = event.loc[((event['type_name'] == 'Starting XI') &
-                                (event['team_name'] == HOME)), ['id', 'tactics_formation']]
-    # joining on the team name and formation to the lineup
-    starting_xi = tactics.merge(starting_xi_event, on='id')
+    starting_xi = starting_xi[starting_xi['team_name'] == HOME].reset_index(drop=True)
     formation = starting_xi['tactics_formation'].iloc[0]
 
     pitch = VerticalPitch(pitch_type="statsbomb", pitch_color="#22312b", line_color="#c7d5cc")
-    fig, ax = pitch.draw(figsize=(6, 8.72))
+    fig, ax = draw_pitch(pitch, figsize=(6, 8.72))
     fig.patch.set_facecolor("#22312b")
 
     ax_text = pitch.formation(formation, positions=starting_xi.position_id, kind='text',
@@ -59,9 +55,9 @@ def get_home_formation(competition_id, season_id, home_team, away_team):
                                 c='red', linewidth=3, s=350, xoffset=-8, ax=ax)
     
     # Add a title
-    plt.title(f"{HOME}", fontsize=12, fontweight="bold", color="white")
+    ax.set_title(f"{HOME}", fontsize=12, fontweight="bold", color="white")
 
-    plt.show()
+    return fig
 
 def get_away_formation(competition_id, season_id, home_team, away_team):
     """
@@ -74,10 +70,10 @@ def get_away_formation(competition_id, season_id, home_team, away_team):
         away_team (str): The name of the away team.
 
     Returns:
-        None: Displays the formation on a football pitch.
+        matplotlib.figure.Figure: The formation on a football pitch.
 
     Dependencies:
-        Requires functions get_match_id, get_event_df, and get_tactics_df for data retrieval.
+        Requires functions get_match_id and get_derived_tables for data retrieval.
         Uses the VerticalPitch class for pitch visualization.
 
     Notes:
@@ -88,19 +84,15 @@ def get_away_formation(competition_id, season_id, home_team, away_team):
         get_home_formation(competition_id=123, season_id=456, home_team='TeamA', away_team='TeamB')
     """
     away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
-    event = get_event_df(away_team_id)
-    tactics = get_tactics_df(away_team_id)
+    starting_xi = get_derived_tables(away_team_id).starting_xi
 
     AWAY = away_team
 
-    starting_xi_event = event.loc[((event['type_name'] == 'Starting XI') &
-                                (event['team_name'] == AWAY)), ['id', 'tactics_formation']]
-    # joining on the team name and formation to the lineup
-    starting_xi = tactics.merge(starting_xi_event, on='id')
+    starting_xi = starting_xi[starting_xi['team_name'] == AWAY].reset_index(drop=True)
     formation = starting_xi['tactics_formation'].iloc[0]
 
     pitch = VerticalPitch(pitch_type="statsbomb", pitch_color="#22312b", line_color="#c7d5cc")
-    fig, ax = pitch.draw(figsize=(6, 8.72))
+    fig, ax = draw_pitch(pitch, figsize=(6, 8.72))
     fig.patch.set_facecolor("#22312b")
 
     ax_text = pitch.formation(formation, positions=starting_xi.position_id, kind='text',
@@ -111,9 +103,9 @@ def get_away_formation(competition_id, season_id, home_team, away_team):
                                 c='red', linewidth=3, s=350, xoffset=-8, ax=ax)
     
     # Add a title
-    plt.title(f"{AWAY}", fontsize=12, fontweight="bold", color="white")
+    ax.set_title(f"{AWAY}", fontsize=12, fontweight="bold", color="white")
 
-    plt.show()
+    return fig
 
 
 
@@ -1,13 +1,81 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-from mplsoccer import Sbopen, Pitch, VerticalPitch
+from matplotlib.lines import Line2D
+from mplsoccer import Pitch
 import warnings
 warnings.filterwarnings("ignore")
 
 import sys
 sys.path.insert(0, "functions/")
 from get_match_id import get_match_id
-from get_event_type import get_event_type
+from get_derived_tables import get_derived_tables
+from get_fixture_index import team_match_ids
+from map_matches import map_matches
+from profiling import timed
+
+sys.path.insert(0, "visualisations/")
+from figures import draw_pitch
+
+# Define color mapping for pass types, passes without a height are drawn in black
+PASS_TYPE_COLORS = {"High Pass": "red", "Ground Pass": "yellow", "Low Pass": "blue"}
+
+@timed("transform")
+def get_gk_passes(away_team_id, team, player=None):
+    """
+    Get the open play passes made by a team's goalkeeper(s) in a match.
+
+    Parameters:
+        away_team_id (int): The ID of the match.
+        team (str): The name of the team.
+        player (str, optional): Only keep passes from this goalkeeper.
+
+    Returns:
+        pandas.DataFrame: One row per pass with the player_name, x, y, end_x, end_y and pass_height_name columns.
+    """
+    events = get_derived_tables(away_team_id).passes
+    mask = ((events["position_name"] == "Goalkeeper") & (events["team_name"] == team) & (events["play_pattern_name"] == "Regular Play"))
+    if player is not None:
+        mask &= events["player_name"] == player
+
+    return events.loc[mask, ["player_name", "x", "y", "end_x", "end_y", "pass_height_name"]]
+
+def draw_gk_passes(gk_passes, title):
+    """
+    Draw goalkeeper passes on a pitch, coloured by pass height.
+
+    Parameters:
+        gk_passes (pandas.DataFrame): Passes from get_gk_passes, for one or many matches.
+        title (str): The title of the plot.
+
+    Returns:
+        matplotlib.figure.Figure: The plot.
+
+    Each pass height is drawn with a single batched arrow (quiver) artist and a single scatter of end points, so the
+    number of artists does not grow with the number of passes.
+    """
+    # Create a Pitch
+    pitch = Pitch(pitch_type="statsbomb", pitch_color="#22312b", line_color="#c7d5cc")
+
+    # Set up the figure and axis
+    fig, ax = draw_pitch(pitch, figsize=(5,5))
+    fig.patch.set_facecolor("#22312b")
+
+    legend_elements = [Line2D([0], [0], color=color, lw=2, label=pass_type)
+                    for pass_type, color in PASS_TYPE_COLORS.items()]
+
+    heights = gk_passes["pass_height_name"].astype(object).map(PASS_TYPE_COLORS).fillna("black")
+    for pass_color, group in gk_passes.groupby(heights):
+        # Plot the passes as arrows
+        pitch.arrows(group["x"], group["y"], group["end_x"], group["end_y"], color=pass_color,
+                     width=1.5, headwidth=4, headlength=4, zorder=1, ax=ax)
+
+        # Plot end points
+        pitch.scatter(group["end_x"], group["end_y"], color=pass_color, s=20, zorder=2, ax=ax)
+
+    # Add title and legend
+    ax.set_title(title, color="white")
+    ax.legend(handles=legend_elements, loc="upper right")
+
+    return fig
 
 def gk_passmap(competition_id, season_id, home_team, away_team):
     """
@@ -19,61 +87,41 @@ def gk_passmap(competition_id, season_id, home_team, away_team):
         home_team (str): The name of the home team.
         away_team (str): The name of the away team.
 
+    Returns:
+        matplotlib.figure.Figure: The passmap.
+
     This function generates a passmap for the goalkeeper's passes in a match. It retrieves goalkeeper passes
-    from the specified competition, season, home team, and away team. The passmap is displayed on a vertical pitch
-    with different colors indicating pass types (High Pass, Ground Pass, Low Pass). Each pass is represented by a
-    line, and the end point is marked with a triangle marker. Arrows indicate the direction of the passes.
+    from the specified competition, season, home team, and away team. The passmap is displayed on a pitch
+    with different colors indicating pass types (High Pass, Ground Pass, Low Pass). Each pass is represented by an
+    arrow, and the end point is marked with a circle marker.
 
     Example:
         gk_passmap(123, 2022, "Team A", "Team B")
     """
-    away_team_id = get_match_id(competition_id, season_id, home_team, away_team) 
-    passes = get_event_type(away_team_id, "Pass")
-    gk_passes = passes[(passes["position_name"] == "Goalkeeper") & (passes["team_name"] == home_team)
-                        & (passes["play_pattern_name"] == "Regular Play")]
-
-    # Create a Vertical Pitch
-    pitch = Pitch(pitch_type="statsbomb", pitch_color="#22312b", line_color="#c7d5cc")
-
-    # Set up the figure and axis
-    fig, ax = pitch.draw(figsize=(5,5))
-    fig.patch.set_facecolor("#22312b")
+    away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
+    gk_passes = get_gk_passes(away_team_id, home_team)
 
-    # Define color mapping for pass types
-    pass_type_colors = {"High Pass": "red", "Ground Pass": "yellow", "Low Pass": "blue"}  
-
-    legend_elements = [plt.Line2D([0], [0], color=color, lw=2, label=pass_type) 
-                    for pass_type, color in pass_type_colors.items()]
-
-    # Loop through the passes and plot them
-    for index, pass_data in gk_passes.iterrows():
-        start_point = (pass_data["x"], pass_data["y"])
-        end_point = (pass_data["end_x"], pass_data["end_y"])
-        pass_type = pass_data["pass_height_name"]
-        
-        # Get color based on pass type, default to black if not found
-        pass_color = pass_type_colors.get(pass_type, "black")
-        
-        # Plot the pass with the determined color
-        ax.plot([start_point[0], end_point[0]], [start_point[1], end_point[1]], color=pass_color, lw=2, zorder=1)
-        
-        # Plot end point with triangle marker
-        ax.plot(end_point[0], end_point[1], 'o', color=pass_color, markersize=6, zorder=2)
-
-        # Add arrow annotation
-        ax.annotate('', end_point, start_point, arrowprops={'arrowstyle': '->', 'color': pass_color, 'lw': 2}, zorder=2)
-
-    # Add title and show the plot
     gk_name = str(gk_passes["player_name"].iloc[0])
-    plt.title(f"{gk_name}'s Passes", color="white")
-    ax.legend(handles=legend_elements, loc="upper right")
-
-    #plt.savefig(f"{gk_name}_passes.png")
-    plt.show()
-
-
+    return draw_gk_passes(gk_passes, f"{gk_name}'s Passes")
 
+def gk_season_passmap(competition_id, season_id, team, player=None, max_workers=None):
+    """
+    Generate a passmap for a goalkeeper's passes over every match of a team in a competition season.
 
+    Parameters:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+        team (str): The name of the team.
+        player (str, optional): The goalkeeper, all of the team's goalkeepers are included when not given.
+        max_workers (int, optional): Number of processes loading matches at the same time.
 
+    Returns:
+        matplotlib.figure.Figure: The passmap.
 
+    Example:
+        gk_season_passmap(2, 27, "Arsenal", player="Petr Čech")
+    """
+    match_ids = team_match_ids(competition_id, season_id, team)
+    gk_passes = pd.concat(map_matches(get_gk_passes, match_ids, team, player, max_workers=max_workers))
 
+    return draw_gk_passes(gk_passes, f"{player or team}'s Passes ({len(match_ids)} matches)")
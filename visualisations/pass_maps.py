@@ -1,20 +1,45 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import cmasher as cmr
 from PIL import Image
 from urllib.request import urlopen
-from mplsoccer import Sbopen, Pitch, add_image
+from mplsoccer import Pitch, add_image
 from highlight_text import ax_text
+from functools import lru_cache
 import warnings
 warnings.filterwarnings("ignore")
 import sys
 
 sys.path.insert(0, "functions/")
 from get_match_id import get_match_id
-from get_event_df import get_event_df
-from get_tactics_df import get_tactics_df
+from get_event_columns import get_event_columns
+from get_derived_tables import get_derived_tables
 from get_lineup_df import get_lineup_df
+from data_store import OFFLINE
+from event_schema import POSITION_ABBREVIATIONS
+
+sys.path.insert(0, "visualisations/")
+from density import event_density, plot_density
+from figures import pitch_grid
+
+# every event type is read, players take the first position they are recorded in
+EVENT_COLUMNS = ["player_id", "position_id"]
+
+SB_LOGO_URL = ('https://raw.githubusercontent.com/statsbomb/open-data/'
+               'master/img/SB%20-%20Icon%20Lockup%20-%20Colour%20positive.png')
+
+@lru_cache(maxsize=1)
+def get_sb_logo():
+    """
+    Download the StatsBomb logo once per process.
+
+    Returns:
+        PIL.Image.Image: The logo, or None in offline mode.
+    """
+    if OFFLINE:
+        return None
+
+    return Image.open(urlopen(SB_LOGO_URL))
 
 def team_pass_maps(competition_id, season_id, home_team, away_team):
     """
@@ -26,6 +51,9 @@ def team_pass_maps(competition_id, season_id, home_team, away_team):
         home_team (str): The name of the home team.
         away_team (str): The name of the away team.
 
+    Returns:
+        matplotlib.figure.Figure: The pass maps.
+
     This function generates pass maps for players in a football match. It retrieves event, tactic, and lineup data,
     filters and processes the data, and plots pass maps for each player. It also includes information about substitutions,
     pass outcomes, and pass success rates.
@@ -34,28 +62,26 @@ def team_pass_maps(competition_id, season_id, home_team, away_team):
         team_pass_maps(123, 2022, "Team A", "Team B")
     """
     away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
-    events = get_event_df(away_team_id)
-    tactics = get_tactics_df(away_team_id)
+    events = get_event_columns(away_team_id, EVENT_COLUMNS)
+    derived = get_derived_tables(away_team_id)
     lineup = get_lineup_df(away_team_id)
 
     # dataframe with player_id and when they were subbed off
-    time_off = events.loc[(events["type_name"] == "Substitution"), ["player_id", "minute"]]
-    time_off.rename({"minute": "off"}, axis="columns", inplace=True)
+    time_off = derived.substitutions[["player_id", "minute"]]
+    time_off = time_off.rename({"minute": "off"}, axis="columns")
 
     # dataframe with player_id and when they were subbed on
-    time_on = events.loc[(events["type_name"] == "Substitution"), ["substitution_replacement_id", "minute"]]
-    time_on.rename({"substitution_replacement_id": "player_id",
-                    "minute": "on"}, axis="columns", inplace=True)
+    time_on = derived.substitutions[["substitution_replacement_id", "minute"]]
+    time_on = time_on.rename({"substitution_replacement_id": "player_id",
+                    "minute": "on"}, axis="columns")
     players_on = time_on["player_id"]
 
     # merge on times subbed on/off
     lineup = lineup.merge(time_on, on="player_id", how="left")
     lineup = lineup.merge(time_off, on="player_id", how="left")
 
-    # filter the tactics lineup for the starting xi
-    starting_ids = events[events["type_name"] == "Starting XI"].id
-    starting_xi = tactics[tactics["id"].isin(starting_ids)]
-    starting_players = starting_xi["player_id"]
+    # the starting xi of both teams
+    starting_players = derived.starting_xi["player_id"]
 
     # filter the lineup for players that actually played
     mask_played = ((lineup["on"].notnull()) | (lineup["off"].notnull()) |
@@ -69,11 +95,7 @@ def team_pass_maps(competition_id, season_id, home_team, away_team):
     lineup = lineup.merge(player_positions, how="left", on="player_id")
 
     # add on the position abbreviation
-    formation_dict = {1: "GK", 2: "RB", 3: "RCB", 4: "CB", 5: "LCB", 6: "LB", 7: "RWB",
-                    8: "LWB", 9: "RDM", 10: "CDM", 11: "LDM", 12: "RM", 13: "RCM",
-                    14: "CM", 15: "LCM", 16: "LM", 17: "RW", 18: "RAM", 19: "CAM",
-                    20: "LAM", 21: "LW", 22: "RCF", 23: "ST", 24: "LCF", 25: "SS"}
-    lineup["position_abbreviation"] = lineup["position_id"].map(formation_dict)
+    lineup["position_abbreviation"] = lineup["position_id"].map(POSITION_ABBREVIATIONS)
 
     # sort the dataframe so the players are
     # in the order of their position (if started), otherwise in the order they came on
@@ -87,12 +109,8 @@ def team_pass_maps(competition_id, season_id, home_team, away_team):
     # filter the events to exclude some set pieces
     set_pieces = ["Throw-in", "Free Kick", "Corner", "Kick Off", "Goal Kick"]
 
-    # for the team pass map
-    pass_receipts = events[(events["team_name"] == home_team) & (events["type_name"] == "Ball Receipt")].copy()
-
     # for the player pass maps
-    passes_excl_throw = events[(events["team_name"] == home_team) & (events["type_name"] == "Pass") &
-                            (events["sub_type_name"] != "Throw-in")].copy()
+    passes_excl_throw = derived.passes[derived.passes["team_name"] == home_team]
 
     # identify how many players played and how many subs were used
     num_players = len(lineup_team)
@@ -112,7 +130,7 @@ def team_pass_maps(competition_id, season_id, home_team, away_team):
     warnings.simplefilter("ignore", UserWarning)
 
     # plot the 5 * 3 grid
-    fig, axs = pitch.grid(nrows=5, ncols=3, figheight=30,
+    fig, axs = pitch_grid(pitch, nrows=5, ncols=3, figheight=30,
                         endnote_height=0.03, endnote_space=0,
                         axis=False,
                         title_height=0.08, grid_height=0.84)
@@ -143,7 +161,7 @@ def team_pass_maps(competition_id, season_id, home_team, away_team):
                                 f'<{len(complete_pass)}>/{total_pass} | '
                                 f'{round(100 * len(complete_pass)/total_pass, 1)}%')
             ax_text(0, -5, annotation_string, ha="left", va="center", fontsize=20,
-                    highlight_textprops=[{"color": "#56ae6c"}], ax=ax)
+                    highlight_textprops=[{"color": "#56ae6c"}], ax=ax, fig=fig)
 
             # add information for subsitutions on/off and arrows
             if not np.isnan(lineup_team.iloc[idx].off):
@@ -156,10 +174,7 @@ def team_pass_maps(competition_id, season_id, home_team, away_team):
                 ax.annotate("", (108, -2), (100, -2), arrowprops=green_arrow)
 
     # plot on the last Pass Map
-    pitch.kdeplot(x=pass_receipts["x"], y=pass_receipts["y"], ax=ax,
-                cmap=cmr.lavender,
-                levels=100,
-                thresh=0, fill=True)
+    plot_density(event_density(away_team_id, home_team, "Ball Receipt"), ax=ax, cmap=cmr.lavender)
     ax.text(0, -5, "Pass Receipt Heatmap", ha="left", va="center",
             fontsize=20)
 
@@ -167,14 +182,12 @@ def team_pass_maps(competition_id, season_id, home_team, away_team):
     for ax in axs["pitch"].flat[11 + num_sub:-1]:
         ax.remove()
 
-    SB_LOGO_URL = ('https://raw.githubusercontent.com/statsbomb/open-data/'
-                'master/img/SB%20-%20Icon%20Lockup%20-%20Colour%20positive.png')
-
-    sb_logo = Image.open(urlopen(SB_LOGO_URL))
-    ax_sb_logo = add_image(sb_logo, fig, left=0.701126,
-                        # set the bottom and height to align with the endnote
-                        bottom=axs["endnote"].get_position().y0,
-                        height=axs["endnote"].get_position().height)
+    sb_logo = get_sb_logo()
+    if sb_logo is not None:
+        ax_sb_logo = add_image(sb_logo, fig, left=0.701126,
+                            # set the bottom and height to align with the endnote
+                            bottom=axs["endnote"].get_position().y0,
+                            height=axs["endnote"].get_position().height)
 
     # title text
     axs["title"].text(0.5, 0.65, f'{home_team} Pass Maps', fontsize=40,
@@ -183,8 +196,7 @@ def team_pass_maps(competition_id, season_id, home_team, away_team):
                 "Team heatmap includes all attempted pass receipts")
     axs["title"].text(0.5, 0.35, SUB_TEXT, fontsize=20, va="center", ha="center")
 
-    #plt.savefig(f"{home_team} Pass Maps vs {away_team}")
-    plt.show()
+    return fig
 
 
 
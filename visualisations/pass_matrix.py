@@ -1,15 +1,136 @@
 import pandas as pd
 import numpy as np
-from mplsoccer import Sbopen
+from functools import reduce
 import warnings
 warnings.filterwarnings("ignore")
 import sys
 
 sys.path.insert(0, "functions/")
 from get_match_id import get_match_id
-from get_event_type import get_event_type
+from get_fixture_index import team_match_ids
+from map_matches import map_matches
+from get_event_columns import get_event_columns
+from get_formation_segments import get_formation_segments
+from profiling import timed
+from sized_cache import sized_cache
+
+# columns and event types read by this visual
+EVENT_COLUMNS = ["team_name", "play_pattern_name", "outcome_name", "player_id", "player_name",
+                 "pass_recipient_id", "pass_recipient_name", "period"]
+EVENT_TYPES = ["Pass"]
+
+def pass_counts(passes, by=None):
+    """
+    Count the completed passes between every pair of players with a single bincount.
+
+    Parameters:
+        passes (pandas.DataFrame): Pass events with player_id, player_name, pass_recipient_id and pass_recipient_name.
+        by (str, optional): Column to slice the counts by, e.g. "period". Passes without a value are left out.
+
+    Returns:
+        tuple: A tuple containing:
+            - numpy.ndarray: Pass counts of shape (slices, players, players), indexed [slice, passer, recipient].
+            - pandas.Index: The player names, in the order of the count axes.
+            - pandas.Index: The slice labels, in the order of the first axis.
 
-def pass_matrix(competition_id, season_id, home_team, away_team):
+    Passers and recipients are paired through the pass recipient id StatsBomb attaches to each pass, so every
+    pass is counted exactly once.
+    """
+    passes = passes[passes["pass_recipient_id"].notnull()]
+    if by is not None:
+        # factorize codes a missing value as -1, which bincount would reject or count in the wrong cell
+        passes = passes[passes[by].notnull()]
+
+    # integer code every player that passed or received
+    ids = np.concatenate([passes["player_id"].to_numpy(dtype=np.int64),
+                          passes["pass_recipient_id"].to_numpy(dtype=np.int64)])
+    names = np.concatenate([passes["player_name"].to_numpy(), passes["pass_recipient_name"].to_numpy()])
+    codes, unique_ids = pd.factorize(ids)
+    player_names = pd.Series(names).groupby(codes).first()
+    num_players = len(unique_ids)
+    passer, recipient = codes[:len(passes)], codes[len(passes):]
+
+    if by is None:
+        slice_codes, slice_labels = np.zeros(len(passes), dtype=np.int64), pd.Index([None])
+    else:
+        slice_codes, slice_labels = pd.factorize(passes[by], sort=True)
+    num_slices = len(slice_labels)
+
+    flat = (slice_codes * num_players + passer) * num_players + recipient
+    counts = np.bincount(flat, minlength=num_slices * num_players * num_players)
+    counts = counts.reshape(num_slices, num_players, num_players)
+
+    return counts, pd.Index(player_names.to_numpy()), pd.Index(slice_labels)
+
+@sized_cache(max_entries=32)
+@timed("transform")
+def team_pass_counts(away_team_id, team, by=None):
+    """
+    Cached pass counts of a team's open play passes in a match, see pass_counts.
+
+    Parameters:
+        away_team_id (int): The ID of the match.
+        team (str): The name of the team.
+        by (str, optional): "period", "tactics_formation" or None.
+    """
+    events = get_event_columns(away_team_id, EVENT_COLUMNS, EVENT_TYPES)
+    passes = events.loc[(events["team_name"] == team) &
+                        (events["play_pattern_name"] == "Regular Play") & (events["outcome_name"].isnull()),
+                        ["player_id", "player_name", "pass_recipient_id", "pass_recipient_name", "period"]]
+
+    if by == "tactics_formation":
+        # the formation in place at each event, from the shared formation segmentation of the match
+        passes = passes.join(get_formation_segments(away_team_id).events["tactics_formation"])
+
+    return pass_counts(passes, by=by)
+
+def match_pass_counts(away_team_id, team, period=None, formation=None):
+    """
+    Count a team's completed open play passes between each pair of players in a match.
+
+    Parameters:
+        away_team_id (int): The ID of the match.
+        team (str): The name of the team.
+        period (int, optional): Only count passes from this period.
+        formation (str, optional): Only count passes made while the team played this formation.
+
+    Returns:
+        pandas.DataFrame: Pass counts with one row per passer and one column per receiver, only players that
+        passed (rows) / received (columns) are included.
+    """
+    if period is not None:
+        counts, players, slices = team_pass_counts(away_team_id, team, by="period")
+        counts = counts[slices == period].sum(axis=0)
+    elif formation is not None:
+        counts, players, slices = team_pass_counts(away_team_id, team, by="tactics_formation")
+        counts = counts[slices == formation].sum(axis=0)
+    else:
+        counts, players, slices = team_pass_counts(away_team_id, team)
+        counts = counts[0]
+
+    passers, recipients = counts.sum(axis=1) > 0, counts.sum(axis=0) > 0
+
+    return pd.DataFrame(counts[np.ix_(passers, recipients)],
+                        index=pd.Index(players[passers], name="passer"),
+                        columns=pd.Index(players[recipients], name="receiver"))
+
+def style_pass_matrix(counts):
+    """
+    Sort a pass count table by name like a crosstab, add the totals and style it with a blue gradient.
+
+    Parameters:
+        counts (pandas.DataFrame): Pass counts from match_pass_counts, or their sum over matches.
+
+    Returns:
+        pandas.io.formats.style.Styler: A styled pass matrix.
+    """
+    pass_matrix = counts.sort_index(axis=0).sort_index(axis=1)
+    pass_matrix["Total"] = pass_matrix.sum(axis=1)
+    pass_matrix.loc["Total"] = pass_matrix.sum(axis=0)
+
+    return pass_matrix.style.background_gradient(cmap="Blues")
+
+def pass_matrix(competition_id, season_id, home_team, away_team, period=None, formation=None):
     """
     Generate a pass matrix for a football match.
 
@@ -18,43 +139,47 @@ def pass_matrix(competition_id, season_id, home_team, away_team):
         season_id (int): The ID of the season.
         home_team (str): The name of the home team.
         away_team (str): The name of the away team.
+        period (int, optional): Only count passes from this period.
+        formation (str, optional): Only count passes made while the home team played this formation.
 
     Returns:
         pandas.io.formats.style.Styler: A styled pass matrix.
 
-    This function generates a pass matrix for a football match. It retrieves passer and receiver data, filters and processes
-    the data, and creates a pass matrix showing the number of passes from each player to another player. The matrix is
-    styled with a blue gradient.
+    This function generates a pass matrix for a football match. It counts the completed open play passes from each
+    home player to each team mate, optionally for a single period or formation, and creates a pass matrix showing the
+    number of passes from each player to another player. The matrix is styled with a blue gradient.
 
     Example:
         pass_matrix(123, 2022, "Team A", "Team B")
     """
     away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
-    passer_df = get_event_type(away_team_id, "Pass")
-    receiver_df = get_event_type(away_team_id, "Ball Receipt")
 
     HOME = home_team
-    AWAY = away_team
 
-    home_passes = passer_df[(passer_df["play_pattern_name"] == "Regular Play") & 
-                            (passer_df["team_name"] == HOME)]
+    counts = match_pass_counts(away_team_id, HOME, period=period, formation=formation)
 
-    home_passes = home_passes[["period", "minute", "match_id", "team_name", 
-                                "player_name", "position_name", "end_x", "end_y"]]
+    return style_pass_matrix(counts)
 
-    home_passes.rename(columns={"player_name":"passer", "position_name":"passer_position"}, inplace=True)
-
-    home_receivers = receiver_df[(receiver_df["play_pattern_name"] == "Regular Play") & 
-                                (receiver_df["team_name"] == HOME)]
+def season_pass_matrix(competition_id, season_id, team, max_workers=None):
+    """
+    Generate a pass matrix of a team over every match it played in a competition season.
 
-    home_receivers = home_receivers[["player_name", "position_name", "x", "y"]]
-    home_receivers.rename(columns={"player_name":"receiver", "position_name":"receiver_position"}, inplace=True)
+    Parameters:
+        competition_id (int): The ID of the competition.
+        season_id (int): The ID of the season.
+        team (str): The name of the team.
+        max_workers (int, optional): Number of processes counting matches at the same time.
 
-    merged_df = pd.merge(home_passes, home_receivers, left_on="end_x", right_on="x", how="inner")
-    merged_df = merged_df[merged_df["passer"] != merged_df["receiver"]]
-    pass_matrix = pd.crosstab(merged_df["passer"], merged_df["receiver"], margins=True, margins_name="Total")
-    pass_matrix = pass_matrix.style.background_gradient(cmap="Blues")
+    Returns:
+        pandas.io.formats.style.Styler: A styled pass matrix.
 
-    return pass_matrix
+    The passes of each match are counted in a process pool and the per-match tables are added up.
 
+    Example:
+        season_pass_matrix(2, 27, "Arsenal")
+    """
+    match_ids = team_match_ids(competition_id, season_id, team)
+    match_counts = map_matches(match_pass_counts, match_ids, team, max_workers=max_workers)
+    counts = reduce(lambda total, counts: total.add(counts, fill_value=0), match_counts)
 
+    return style_pass_matrix(counts.fillna(0).astype(int))
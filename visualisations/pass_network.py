@@ -1,113 +1,68 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from matplotlib.colors import to_rgba
-from urllib.request import urlopen
-from mplsoccer import Sbopen, Pitch, add_image
-from highlight_text import ax_text
+from mplsoccer import Pitch
 import warnings
 warnings.filterwarnings("ignore")
 import sys
 
 sys.path.insert(0, "functions/")
 from get_match_id import get_match_id
-from get_event_df import get_event_df
-from get_tactics_df import get_tactics_df
+from get_fixture_index import team_match_ids
+from map_matches import map_matches
+from get_event_columns import get_event_columns
+from get_formation_segments import get_formation_segments
+from profiling import timed
 
-def get_formations(competition_id, season_id, home_team, away_team):
-    """
-    Retrieve the unique formations used by the specified home team.
+sys.path.insert(0, "visualisations/")
+from figures import pitch_grid
 
-    Args:
-        away_team_id (int): The ID of the away team.
-        home_team (str): The name of the home team.
+# columns and event types read by this visual
+EVENT_COLUMNS = ["id", "team_name", "type_name", "x", "y"]
+EVENT_TYPES = ["Pass", "Ball Receipt"]
 
-    Returns:
-        list: A list of unique formations used by the specified home team.
+@timed("transform")
+def pass_network_counts(away_team_id, team, formation=None):
     """
-    away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
-    events = get_event_df(away_team_id)
-    events.loc[events["tactics_formation"].notnull(), "tactics_id"] = events.loc[
-    events["tactics_formation"].notnull(), "id"]
-
-    events[["tactics_id", "tactics_formation"]] = events.groupby("team_name")[[
-    "tactics_id", "tactics_formation"]].ffill()
-    events["tactics_formation"] = events["tactics_formation"].astype("int").astype("str")
-    grouped = events.groupby("team_name").tactics_formation.unique()
-    home_formation = list(grouped[home_team])
-
-    return home_formation
-
-def pass_network(competition_id, season_id, home_team, away_team, formation):
-    """
-    Generate a pass network visualization for a given match.
+    Sum a team's touch locations and count its passes between positions in a match, in a form that adds up
+    over matches.
 
     Args:
-        competition_id (int): ID of the competition.
-        season_id (int): ID of the season.
-        home_team (str): Name of the home team.
-        away_team (str): Name of the away team.
-        formation (str): Formation code.
+        away_team_id (int): The ID of the match.
+        team (str): The name of the team.
+        formation (str, optional): Only use events while the team played this formation, all formations
+            are used when not given.
 
     Returns:
-        Pass Network
+        tuple: A tuple containing:
+            - pandas.DataFrame: Indexed by position_abbreviation, the sum of the x and y locations of the
+              passes and receipts of each position and their count.
+            - pandas.DataFrame: Indexed by (pos_min, pos_max), the pass_count between each pair of positions
+              (using min/ max so passes both ways are counted together).
     """
-    away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
-    events = get_event_df(away_team_id)
-    tactics = get_tactics_df(away_team_id)
-
-    TEAM = home_team
-
-    events.loc[events["tactics_formation"].notnull(), "tactics_id"] = events.loc[
-        events["tactics_formation"].notnull(), "id"]
-
-    events[["tactics_id", "tactics_formation"]] = events.groupby("team_name")[[
-        "tactics_id", "tactics_formation"]].ffill()
-
-    formation_dict = {1: "GK", 2: "RB", 3: "RCB", 4: "CB", 5: "LCB", 6: "LB", 7: "RWB",
-                    8: "LWB", 9: "RDM", 10: "CDM", 11: "LDM", 12: "RM", 13: "RCM",
-                    14: "CM", 15: "LCM", 16: "LM", 17: "RW", 18: "RAM", 19: "CAM",
-                    20: "LAM", 21: "LW", 22: "RCF", 23: "ST", 24: "LCF", 25: "SS"}
-    tactics["position_abbreviation"] = tactics["position_id"].map(formation_dict)
-
-    sub = events.loc[events["type_name"] == "Substitution",
-                    ["tactics_id", "player_id", "substitution_replacement_id",
-                    "substitution_replacement_name"]]
-
-    players_sub = tactics.merge(sub.rename({"tactics_id": "id"}, axis="columns"),
-                                on=["id", "player_id"], how="inner", validate="1:1")
-    players_sub = (players_sub[["id", "substitution_replacement_id", "position_abbreviation"]]
-                .rename({"substitution_replacement_id": "player_id"}, axis="columns"))
-
-    tactics = pd.concat([tactics, players_sub])
-    tactics.rename({"id": "tactics_id"}, axis="columns", inplace=True)
-    tactics = tactics[["tactics_id", "player_id", "position_abbreviation"]]
+    events = get_event_columns(away_team_id, EVENT_COLUMNS, EVENT_TYPES)
+    segments = get_formation_segments(away_team_id).events
 
-    # add on the position the player was playing in the formation to the events dataframe
-    events = events.merge(tactics, on=["tactics_id", "player_id"], how="left", validate="m:1")
+    TEAM = team
 
-    # add on the position the receipient was playing in the formation to the events dataframe
-    events = events.merge(tactics.rename({"player_id": "pass_recipient_id"},
-                                        axis="columns"), on=["tactics_id", "pass_recipient_id"],
-                        how="left", validate="m:1", suffixes=["", "_receipt"])
-    
-    events["tactics_formation"] = events["tactics_formation"].astype("int").astype("str")
-    FORMATION = formation
+    # add on the formation and the positions of the passer and recipient in that formation
+    events = events.join(
+        segments[["tactics_formation", "position_abbreviation", "position_abbreviation_receipt"]])
+    events = events[events.team_name == TEAM]
+    if formation is not None:
+        events = events[events.tactics_formation == formation]
 
     pass_cols = ["id", "position_abbreviation", "position_abbreviation_receipt"]
-    passes_formation = events.loc[(events.team_name == TEAM) & (events.type_name == "Pass") &
-                                (events.tactics_formation == formation) &
+    passes_formation = events.loc[(events.type_name == "Pass") &
                                 (events.position_abbreviation_receipt.notnull()), pass_cols].copy()
 
     location_cols = ["position_abbreviation", "x", "y"]
-    location_formation = events.loc[(events.team_name == TEAM) &
-                                    (events.type_name.isin(["Pass", "Ball Receipt"])) &
-                                    (events.tactics_formation == FORMATION), location_cols].copy()
+    location_formation = events[location_cols]
 
-    # average locations
-    average_locs_and_count = (location_formation.groupby("position_abbreviation")
-                            .agg({"x": ["mean"], "y": ["mean", "count"]}))
-    average_locs_and_count.columns = ["x", "y", "count"]
+    # summed locations
+    location_sums = (location_formation.groupby("position_abbreviation")
+                     .agg({"x": ["sum"], "y": ["sum", "count"]}))
+    location_sums.columns = ["x", "y", "count"]
 
     # calculate the number of passes between each position (using min/ max so we get passes both ways)
     passes_formation["pos_max"] = (passes_formation[["position_abbreviation",
@@ -116,10 +71,29 @@ def pass_network(competition_id, season_id, home_team, away_team, formation):
     passes_formation["pos_min"] = (passes_formation[["position_abbreviation",
                                                     "position_abbreviation_receipt"]]
                                 .min(axis="columns"))
-    passes_between = passes_formation.groupby(["pos_min", "pos_max"]).id.count().reset_index()
-    passes_between.rename({"id": "pass_count"}, axis="columns", inplace=True)
+    passes_between = passes_formation.groupby(["pos_min", "pos_max"]).id.count().to_frame("pass_count")
+
+    return location_sums, passes_between
+
+def draw_pass_network(location_sums, passes_between, title, subtitle):
+    """
+    Draw a pass network from the counts of pass_network_counts, for one match or summed over several.
+
+    Args:
+        location_sums (pandas.DataFrame): Summed touch locations and counts, indexed by position.
+        passes_between (pandas.DataFrame): Pass counts, indexed by (pos_min, pos_max).
+        title (str): The title of the plot.
+        subtitle (str): The text under the title, e.g. the formation.
+
+    Returns:
+        matplotlib.figure.Figure: The pass network.
+    """
+    # average locations
+    average_locs_and_count = location_sums[["x", "y"]].div(location_sums["count"], axis="index")
+    average_locs_and_count["count"] = location_sums["count"]
 
     # add on the location of each player so we have the start and end positions of the lines
+    passes_between = passes_between.reset_index()
     passes_between = passes_between.merge(average_locs_and_count, left_on="pos_min", right_index=True)
     passes_between = passes_between.merge(average_locs_and_count, left_on="pos_max", right_index=True,
                                         suffixes=["", "_end"])
@@ -139,7 +113,7 @@ def pass_network(competition_id, season_id, home_team, away_team, formation):
     color[:, 3] = c_transparency
 
     pitch = Pitch(pitch_type="statsbomb", pitch_color="#22312b", line_color="#c7d5cc")
-    fig, axs = pitch.grid(figheight=10, title_height=0.08, endnote_space=0,
+    fig, axs = pitch_grid(pitch, figheight=10, title_height=0.08, endnote_space=0,
                         axis=False,
                         title_space=0, grid_height=0.82, endnote_height=0.05)
     fig.set_facecolor("#22312b")
@@ -154,13 +128,58 @@ def pass_network(competition_id, season_id, home_team, away_team, formation):
                     ha="center", size=16, weight="bold", ax=axs["pitch"])
 
     # endnote /title
-    TITLE_TEXT = f"{TEAM} Pass Network"
-    axs["title"].text(0.5, 0.7, TITLE_TEXT, color="#c7d5cc",
+    axs["title"].text(0.5, 0.7, title, color="#c7d5cc",
                     va="center", ha="center", fontsize=30)
-    axs["title"].text(0.5, 0.25, f"{FORMATION}", color="#c7d5cc",
+    axs["title"].text(0.5, 0.25, subtitle, color="#c7d5cc",
                     va="center", ha="center", fontsize=18)
 
-    #plt.savefig("pass_network")
-    plt.show()
+    return fig
+
+def pass_network(competition_id, season_id, home_team, away_team, formation):
+    """
+    Generate a pass network visualization for a given match.
+
+    Args:
+        competition_id (int): ID of the competition.
+        season_id (int): ID of the season.
+        home_team (str): Name of the home team.
+        away_team (str): Name of the away team.
+        formation (str): Formation code.
+
+    Returns:
+        matplotlib.figure.Figure: The pass network.
+    """
+    away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
+    location_sums, passes_between = pass_network_counts(away_team_id, home_team, formation)
+
+    return draw_pass_network(location_sums, passes_between, f"{home_team} Pass Network", f"{formation}")
+
+def season_pass_network(competition_id, season_id, team, formation=None, max_workers=None):
+    """
+    Generate the average pass network of a team over every match it played in a competition season.
+
+    Args:
+        competition_id (int): ID of the competition.
+        season_id (int): ID of the season.
+        team (str): Name of the team.
+        formation (str, optional): Only use the spells the team played this formation.
+        max_workers (int, optional): Number of processes counting matches at the same time.
+
+    Returns:
+        matplotlib.figure.Figure: The pass network.
+
+    Notes:
+        The locations and passes of each match are counted in a process pool, then summed so the average
+        location of each position is weighted by its touches over the season.
+
+    Example:
+        season_pass_network(competition_id=2, season_id=27, team="Arsenal", formation="4231")
+    """
+    match_ids = team_match_ids(competition_id, season_id, team)
+    match_counts = map_matches(pass_network_counts, match_ids, team, formation, max_workers=max_workers)
 
+    location_sums = pd.concat([locations for locations, _ in match_counts]).groupby(level=0).sum()
+    passes_between = pd.concat([passes for _, passes in match_counts]).groupby(level=[0, 1]).sum()
 
+    return draw_pass_network(location_sums, passes_between, f"{team} Pass Network",
+                             f"{formation or 'All formations'} | {len(match_ids)} matches")
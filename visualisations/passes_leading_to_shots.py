@@ -1,16 +1,22 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from matplotlib.colors import to_rgba
-from mplsoccer import Sbopen, Pitch, add_image, VerticalPitch
-from highlight_text import ax_text
+from mplsoccer import VerticalPitch
 import warnings
 warnings.filterwarnings("ignore")
 import sys
 
 sys.path.insert(0, "functions/")
 from get_match_id import get_match_id
-from get_event_df import get_event_df
+from get_event_columns import get_event_columns
+from get_derived_tables import get_derived_tables
+
+sys.path.insert(0, "visualisations/")
+from figures import pitch_grid
+
+# columns and event types read by this visual, throw-ins can assist shots so every pass is read
+EVENT_COLUMNS = ["team_name", "x", "y", "end_x", "end_y", "pass_assisted_shot_id"]
+EVENT_TYPES = ["Pass"]
 
 def passes_leading_to_shots(competition_id, season_id, home_team, away_team):
     """
@@ -23,17 +29,18 @@ def passes_leading_to_shots(competition_id, season_id, home_team, away_team):
         away_team (str): The name of the away team.
 
     Returns:
-        None
+        matplotlib.figure.Figure: The plot.
 
     This function generates a visualization of passes leading to shots in a football match. It retrieves event data,
     filters and processes the data to identify passes leading to shots, and creates a plot showing the passes and
-    corresponding shots. The plot is saved as a file named "passes_to_shots".
+    corresponding shots.
 
     Example:
         passes_leading_to_shots(123, 2022, "Team A", "Team B")
     """
     away_team_id = get_match_id(competition_id, season_id, home_team, away_team)
-    df = get_event_df(away_team_id)
+    df = get_event_columns(away_team_id, EVENT_COLUMNS, EVENT_TYPES)
+    shots = get_derived_tables(away_team_id).shots
 
     TEAM1 = home_team
     TEAM2 = away_team
@@ -41,7 +48,7 @@ def passes_leading_to_shots(competition_id, season_id, home_team, away_team):
     df_pass = df.loc[(df["pass_assisted_shot_id"].notnull()) & (df["team_name"] == home_team),
                     ["x", "y", "end_x", "end_y", "pass_assisted_shot_id"]]
 
-    df_shot = (df.loc[(df["type_name"] == "Shot") & (df["team_name"] == home_team),
+    df_shot = (shots.loc[(shots["type_name"] == "Shot") & (shots["team_name"] == home_team),
                     ["id", "outcome_name", "shot_statsbomb_xg"]]
             .rename({"id": "pass_assisted_shot_id"}, axis=1))
 
@@ -52,7 +59,7 @@ def passes_leading_to_shots(competition_id, season_id, home_team, away_team):
     # Setup the pitch
     pitch = VerticalPitch(pitch_type="statsbomb", pitch_color="#22312b", line_color="#c7d5cc",
                         half=True, pad_top=2)
-    fig, axs = pitch.grid(endnote_height=0.03, endnote_space=0, figheight=12,
+    fig, axs = pitch_grid(pitch, endnote_height=0.03, endnote_space=0, figheight=12,
                         title_height=0.08, title_space=0, axis=False,
                         grid_height=0.82)
     fig.set_facecolor("#22312b")
@@ -73,7 +80,6 @@ def passes_leading_to_shots(competition_id, season_id, home_team, away_team):
     axs["title"].text(0.5, 0.5, f"{TEAM1} Passes Leading to Shots", color="#dee6ea",
                     va="center", ha="center", fontsize=25)
 
-    #plt.savefig("passes_to_shots")
-    plt.show()
+    return fig
 
 
@@ -0,0 +1,222 @@
+import importlib
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+import sys
+
+sys.path.insert(0, "functions/")
+from figure_cache import figure_cache_key, get_cached_figure
+from profiling import collect_spans, merge_spans, span
+
+sys.path.insert(0, "visualisations/")
+from render_scheduler import VISUAL_MODULES, TABLE_VISUALS, render_image, schedule_render
+
+# number of render processes, set SB_RENDER_WORKERS to change it. With 0 figures are rendered on the calling
+# thread, as schedule_render does.
+RENDER_WORKERS = int(os.environ.get("SB_RENDER_WORKERS", os.cpu_count() or 1))
+
+# Streamlit installs the script as __main__, so a spawned worker would run the whole app again on start. Workers
+# are forked instead, like map_matches does, and start with warm copies of the server's caches. Without fork
+# (Windows) figures are rendered on the calling thread.
+MP_CONTEXT = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+
+# (module, attribute, factory) of the locks used while rendering. A fork copies them in whatever state another
+# thread of the server left them, so each worker replaces them with fresh ones.
+RENDER_LOCKS = [("sized_cache", "_lock", threading.RLock), ("figure_cache", "_lock", threading.Lock),
+                ("figures", "_pyplot_lock", threading.Lock), ("profiling", "_log_lock", threading.Lock)]
+
+# seconds between two checks of a pending render, on_wait is called in between
+POLL_SECONDS = 0.25
+
+# a render a session waits for: its request, figure cache key and the future of the PNG image
+PendingRender = namedtuple("PendingRender", ["request", "key", "future"])
+
+# worker index -> single process executor, so a worker can be chosen per fixture
+_workers = {}
+# figure cache key -> [future, number of sessions waiting for it]
+_inflight = {}
+_lock = threading.RLock()
+
+def _warm_worker():
+    """
+    Runs once in each worker: undoes what the fork copied from the server (its signal handlers and locks) and
+    pays for the imports of every visual before the first job arrives.
+    """
+    # the server's handlers would try to stop a server the worker does not run, leaving it alive on shutdown,
+    # and Ctrl+C is handled by the server, which shuts the workers down
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGQUIT, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for module_name, attribute, factory in RENDER_LOCKS:
+        if module_name in sys.modules:
+            setattr(sys.modules[module_name], attribute, factory())
+    import matplotlib
+    matplotlib.use("Agg")
+    for module_name in dict.fromkeys(VISUAL_MODULES.values()):
+        importlib.import_module(module_name)
+
+def fixture_worker(request, workers=None):
+    """
+    Picks the worker rendering a fixture. Every visual of a fixture goes to the same worker, so the match
+    tables it loaded for the first one are still in its caches for the next.
+
+    Args:
+        request (RenderRequest): The visual and selections to render.
+        workers (int, optional): Number of workers, defaults to RENDER_WORKERS.
+
+    Returns:
+        int: The worker index.
+    """
+    fixture = f"{request.competition_id}|{request.season_id}|{request.home_team}|{request.away_team}"
+
+    return zlib.crc32(fixture.encode("utf-8")) % (workers or RENDER_WORKERS)
+
+def _render_traced(request):
+    # runs in the worker, its spans go back with the image so the server's trace keeps the stage breakdown
+    with collect_spans() as collected:
+        image = render_image(request)
+
+    return image, collected
+
+def _new_worker():
+    return ProcessPoolExecutor(max_workers=1, mp_context=MP_CONTEXT, initializer=_warm_worker)
+
+def _submit(index, request):
+    if index not in _workers:
+        _workers[index] = _new_worker()
+    try:
+        return _workers[index].submit(_render_traced, request)
+    except BrokenProcessPool:
+        # the worker died, e.g. it ran out of memory, so start a fresh one
+        _workers[index] = _new_worker()
+        return _workers[index].submit(_render_traced, request)
+
+def _forget(key, future):
+    with _lock:
+        if key in _inflight and _inflight[key][0] is future:
+            del _inflight[key]
+
+def submit_render(request):
+    """
+    Starts rendering a figure visual in the worker of its fixture.
+
+    Args:
+        request (RenderRequest): The visual and selections to render, not a table visual.
+
+    Returns:
+        PendingRender: The render, its future resolves to the PNG image and the spans collected while
+        rendering it (None when profiling is off or it was rendered on this thread). It is already resolved
+        when the image is in the figure cache or there are no workers.
+
+    Notes:
+        Sessions asking for the same image while it renders share one job. Each worker keeps its own sized
+        caches, so SB_CACHE_BYTES applies per worker.
+    """
+    key = figure_cache_key(*request)
+    image = get_cached_figure(key)
+    if image is not None or RENDER_WORKERS <= 0 or MP_CONTEXT is None:
+        future = Future()
+        try:
+            future.set_result((image if image is not None else render_image(request), None))
+        except Exception as e:
+            future.set_exception(e)
+        return PendingRender(request, key, future)
+
+    with _lock:
+        inflight = _inflight.get(key)
+        if inflight is None:
+            future = _submit(fixture_worker(request), request)
+            inflight = _inflight[key] = [future, 0]
+            future.add_done_callback(partial(_forget, key))
+        inflight[1] += 1
+
+    return PendingRender(request, key, inflight[0])
+
+def cancel_render(pending):
+    """
+    Stops waiting for a render, e.g. because the user changed their selection.
+
+    Args:
+        pending (PendingRender): The render from submit_render.
+
+    Notes:
+        The job is cancelled when no other session waits for it and it has not started yet. A job already
+        running finishes in its worker and its image lands in the figure cache.
+    """
+    with _lock:
+        inflight = _inflight.get(pending.key)
+        if inflight is None or inflight[0] is not pending.future:
+            return
+        inflight[1] -= 1
+        if inflight[1] <= 0:
+            pending.future.cancel()
+
+def await_render(request, state, on_wait=None, poll_seconds=POLL_SECONDS):
+    """
+    Renders a visual request in the worker pool and waits for it, like schedule_render does on this thread.
+
+    Args:
+        request (RenderRequest): The visual and selections to render.
+        state (dict-like): Per-session storage, e.g. st.session_state.
+        on_wait (callable, optional): Called with the seconds waited so far every poll_seconds. Updating the
+            page from it lets Streamlit stop the script when the user changes their selection.
+        poll_seconds (float): Seconds between two checks of the render.
+
+    Returns:
+        bytes or pandas.io.formats.style.Styler: The PNG image of the visual, or the styled table for visuals
+        in TABLE_VISUALS, which are cheap and still rendered on this thread.
+
+    Notes:
+        The pending render is kept in state, so a rerun of the script waits for it again rather than starting
+        a second job. A rerun with another request cancels it first.
+        With SB_PROFILE set, the spans the worker recorded are added to the current trace under a "wait"
+        span, which keeps only the time spent queued and passing the image back.
+    """
+    if state.get("rendered_request") == request:
+        return state["rendered_result"]
+
+    pending = state.get("pending_render")
+    if pending is not None and pending.request != request:
+        cancel_render(pending)
+        pending = state["pending_render"] = None
+    if request.visual in TABLE_VISUALS:
+        return schedule_render(request, state)
+
+    if pending is None:
+        pending = state["pending_render"] = submit_render(request)
+    start = time.perf_counter()
+    try:
+        with span(request.visual, "wait"):
+            while True:
+                try:
+                    image, collected = pending.future.result(timeout=poll_seconds)
+                    break
+                except TimeoutError:
+                    if on_wait is not None:
+                        on_wait(time.perf_counter() - start)
+            merge_spans(collected)
+    finally:
+        # a stopped script leaves the render pending for its rerun, a failed one is submitted again
+        if pending.future.done():
+            state["pending_render"] = None
+    state["rendered_request"] = request
+    state["rendered_result"] = image
+
+    return image
+
+def shutdown_workers():
+    """
+    Stops the render processes, pending jobs are cancelled.
+    """
+    with _lock:
+        workers = list(_workers.values())
+        _workers.clear()
+    for executor in workers:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,138 @@
+import importlib
+from collections import namedtuple
+import sys
+
+sys.path.insert(0, "functions/")
+from figure_cache import figure_cache_key, encode_figure, get_cached_figure, put_cached_figure
+from profiling import span
+
+sys.path.insert(0, "visualisations/")
+
+# Describes a visual the user asked for. params is a tuple of (name, value) pairs so the
+# request is hashable and two requests compare equal when every selection matches.
+RenderRequest = namedtuple("RenderRequest", ["visual", "competition_id", "season_id",
+                                             "home_team", "away_team", "params"])
+
+# visual name (as shown in the sidebar) -> module drawing it. The modules pull in matplotlib, mplsoccer and
+# friends, so each one is only imported the first time its visual is rendered.
+VISUAL_MODULES = {
+    "Starting XIs": "get_formations",
+    "Cumulative xG": "cumulative_xg",
+    "Player Defensive Actions": "defensive_actions",
+    "Team Defensive Actions": "defensive_actions",
+    "GK Passing Distribution": "gk_passes",
+    "Player Pass Maps": "pass_maps",
+    "Pass Matrix": "pass_matrix",
+    "Pass Network": "pass_network",
+    "Passes Leading to Shots": "passes_leading_to_shots",
+}
+
+def load_visual(visual, function_name):
+    """
+    Imports the module of a visual, the first time it is needed, and returns one of its functions.
+
+    Args:
+        visual (str): The visual name, a key of VISUAL_MODULES.
+        function_name (str): The function to return from the module.
+
+    Returns:
+        callable: The function.
+    """
+    module_name = VISUAL_MODULES[visual]
+    if module_name in sys.modules:
+        # still goes through the import system, which waits while another thread is importing the module,
+        # sys.modules already holds it half initialised then
+        module = importlib.import_module(module_name)
+    else:
+        with span(module_name, "import"):
+            # the few figures still created through pyplot must not need a GUI, renders run off the main thread
+            import matplotlib
+            matplotlib.use("Agg")
+            module = importlib.import_module(module_name)
+
+    return getattr(module, function_name)
+
+def _figure(visual, function_name):
+    """
+    Wraps a visual function so that it takes a RenderRequest and returns the figure it built.
+    """
+    def render(request):
+        return load_visual(visual, function_name)(request.competition_id, request.season_id,
+                                                  home_team=request.home_team, away_team=request.away_team,
+                                                  **dict(request.params))
+
+    return render
+
+def _starting_xi(request):
+    function_name = "get_home_formation" if dict(request.params)["side"] == "Home" else "get_away_formation"
+    return load_visual("Starting XIs", function_name)(request.competition_id, request.season_id,
+                                                      home_team=request.home_team, away_team=request.away_team)
+
+def _pass_matrix(request):
+    return load_visual("Pass Matrix", "pass_matrix")(request.competition_id, request.season_id,
+                                                     home_team=request.home_team, away_team=request.away_team)
+
+# visual name -> function turning a RenderRequest into a result
+VISUALS = {
+    "Starting XIs": _starting_xi,
+    "Cumulative xG": _figure("Cumulative xG", "cumulative_xg"),
+    "Player Defensive Actions": _figure("Player Defensive Actions", "defensive_actions"),
+    "Team Defensive Actions": _figure("Team Defensive Actions", "team_defensive_map"),
+    "GK Passing Distribution": _figure("GK Passing Distribution", "gk_passmap"),
+    "Player Pass Maps": _figure("Player Pass Maps", "team_pass_maps"),
+    "Pass Matrix": _pass_matrix,
+    "Pass Network": _figure("Pass Network", "pass_network"),
+    "Passes Leading to Shots": _figure("Passes Leading to Shots", "passes_leading_to_shots"),
+}
+
+# visuals that return a table rather than a figure, these are not image cached
+TABLE_VISUALS = {"Pass Matrix"}
+
+def render_image(request):
+    """
+    Renders a figure visual to PNG bytes, serving it from the figure cache when possible.
+
+    Args:
+        request (RenderRequest): The visual and selections to render.
+
+    Returns:
+        bytes: The PNG image.
+    """
+    key = figure_cache_key(*request)
+    image = get_cached_figure(key)
+    if image is None:
+        with span(request.visual, "plot"):
+            fig = VISUALS[request.visual](request)
+        image = encode_figure(fig)
+        put_cached_figure(key, image)
+
+    return image
+
+def schedule_render(request, state):
+    """
+    Renders a visual request, skipping the work when it matches the last rendered request.
+
+    Args:
+        request (RenderRequest): The visual and selections to render.
+        state (dict-like): Per-session storage, e.g. st.session_state.
+
+    Returns:
+        bytes or pandas.io.formats.style.Styler: The PNG image of the visual, or the styled
+        table for visuals in TABLE_VISUALS.
+
+    Notes:
+        Widgets only build RenderRequests, this is the single place where data is fetched and
+        plotted, so it should only be called once the user has applied their selection.
+    """
+    if state.get("rendered_request") == request:
+        return state["rendered_result"]
+
+    if request.visual in TABLE_VISUALS:
+        with span(request.visual, "plot"):
+            result = VISUALS[request.visual](request)
+    else:
+        result = render_image(request)
+    state["rendered_request"] = request
+    state["rendered_result"] = result
+
+    return result